@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+
+
+# -*-coding:Utf-8 -*
+#--------------------------------------------------------------------------------
+# jtlib: benchmark.py
+#
+# Throughput benchmarks run against a local stand-in JIRA server.
+#--------------------------------------------------------------------------------
+# BSD 2-Clause License
+#
+# Copyright (c) 2018, Brian Minard
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#--------------------------------------------------------------------------------
+
+
+import click
+import multiprocessing
+import os
+import resource
+import sys
+import time
+import types
+
+
+project_key = 'BENCH'
+
+
+def run_search(client, page_size, concurrency):
+    """Return the number of issues returned by Jira.search()."""
+    import jtlib.issue
+    issue_list = client.search('PROJECT = "{}"'.format(project_key), fields = jtlib.issue.issue_field_list,
+        page_size = page_size, concurrency = concurrency)
+    return sum(1 for _ in issue_list)
+
+
+def run_search_raw(client, page_size, concurrency):
+    """Return the number of issues returned by Jira.search() without constructing issue resources."""
+    import jtlib.issue
+    issue_list = client.search('PROJECT = "{}"'.format(project_key), fields = jtlib.issue.issue_field_list,
+        page_size = page_size, concurrency = concurrency, raw = True)
+    return sum(1 for _ in issue_list)
+
+
+def count(issue_list, counter):
+    """Pass issues through while counting them."""
+    for issue in issue_list:
+        counter[0] += 1
+        yield issue
+
+
+def run_emit_issue_fields(client, page_size, concurrency):
+    """Return the number of issues exported by emit_issue_fields()."""
+    import jtlib.issue
+    counter = [ 0, ]
+    issue_list = client.search('PROJECT = "{}"'.format(project_key), fields = jtlib.issue.issue_field_list,
+        page_size = page_size, concurrency = concurrency, raw = True)
+    jtlib.issue.emit_issue_fields(types.SimpleNamespace(obj = { 'jira client': client, }), count(issue_list, counter))
+    return counter[0]
+
+
+def run_emit_worklog_fields(client, page_size, concurrency):
+    """Return the number of issues exported by emit_worklog_fields()."""
+    import jtlib.issue
+    counter = [ 0, ]
+    issue_list = client.search('PROJECT = "{}"'.format(project_key), fields = jtlib.issue.worklog_field_list,
+        page_size = page_size, concurrency = concurrency, raw = True)
+    jtlib.issue.emit_worklog_fields(types.SimpleNamespace(obj = { 'jira client': client, }), count(issue_list, counter), concurrency)
+    return counter[0]
+
+
+benchmark_list = {
+    'search': run_search,
+    'search_raw': run_search_raw,
+    'emit_issue_fields': run_emit_issue_fields,
+    'emit_worklog_fields': run_emit_worklog_fields,
+}
+
+
+def run_benchmark(url, name, page_size, concurrency, connection):
+    """Run one benchmark in a fresh process so that its peak memory use is its own.
+
+    Sends the issue count, wall time and peak resident set size (kB) on the
+    connection. Output written by the benchmark is discarded.
+    """
+    import jtlib.client
+    sys.stdout = open(os.devnull, 'w')
+    client = jtlib.client.Jira(url, pool_size = max(10, concurrency))
+    start_time = time.time()
+    issue_count = benchmark_list[name](client, page_size, concurrency)
+    wall_time = time.time() - start_time
+    connection.send((issue_count, wall_time, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+@click.command()
+@click.option('--issues', help = 'Number of issues in the synthetic project.', type = click.IntRange(min = 1), default = 2000, show_default = True)
+@click.option('--latency', help = 'Seconds the server waits before each response.', type = click.FloatRange(min = 0), default = 0.0, show_default = True)
+@click.option('--page-size', help = 'Search page size; repeat to compare sizes.', type = click.IntRange(min = 1), multiple = True, default = [ 50, 100, 500, ], show_default = True)
+@click.option('--concurrency', help = 'Number of parallel requests.', type = click.IntRange(min = 1), default = 1, show_default = True)
+@click.option('--benchmark', help = 'Benchmark to run; repeat to run several.', type = click.Choice(sorted(benchmark_list)), multiple = True)
+def main(issues, latency, page_size, concurrency, benchmark):
+    """Measure jtlib throughput against a local stand-in JIRA server.
+
+    Reports issues per second, HTTP requests per exported issue, wall time and
+    peak resident set size for each benchmark and page size.
+    """
+    import jtlib.mockserver
+    context = multiprocessing.get_context('spawn')
+    click.echo('{:<20} {:>9} {:>8} {:>8} {:>9} {:>12} {:>14} {:>13}'.format('benchmark', 'page size', 'latency',
+        'issues', 'wall (s)', 'issues/sec', 'requests/issue', 'peak RSS (MB)'))
+    with jtlib.mockserver.MockJiraServer({ project_key: issues, }, latency) as server:
+        for name in benchmark or sorted(benchmark_list):
+            for size in page_size:
+                receiver, sender = context.Pipe(duplex = False)
+                process = context.Process(target = run_benchmark, args = (server.url, name, size, concurrency, sender))
+                request_count = server.request_count
+                process.start()
+                issue_count, wall_time, peak_rss = receiver.recv()
+                process.join()
+                request_count = server.request_count - request_count
+                click.echo('{:<20} {:>9} {:>8.3f} {:>8} {:>9.2f} {:>12.1f} {:>14.3f} {:>13.1f}'.format(name, size,
+                    latency, issue_count, wall_time, issue_count / wall_time, request_count / max(1, issue_count),
+                    peak_rss / 1024.0))
+
+
+if __name__ == '__main__':
+    main()
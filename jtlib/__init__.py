@@ -34,7 +34,46 @@
 #--------------------------------------------------------------------------------
 
 
-from jtlib.client import *
-from jtlib.issue import *
-from jtlib.projects import *
-from jtlib.scripts import *
+import importlib
+
+
+submodule_list = [ # Imported on first use.
+    'cache', 'client', 'daemon', 'issue', 'mockserver', 'output', 'parallel', 'profiling', 'projects', 'ratelimit',
+    'report', 'scripts', 'stats',
+]
+submodule_of = { # Submodule defining each name exported by the package.
+    'IssueCache': 'cache',
+    'ProjectCache': 'cache',
+    'AsyncJira': 'client',
+    'InvalidQuery': 'client',
+    'InvalidUrl': 'client',
+    'Jira': 'client',
+    'JiraServerError': 'client',
+    'JiraTimeout': 'client',
+    'MalformedKey': 'issue',
+    'canonify_value': 'issue',
+    'emit_changelog_fields': 'issue',
+    'emit_issue_fields': 'issue',
+    'emit_worklog_fields': 'issue',
+    'get_attribute_value': 'issue',
+    'issue_key_regex': 'issue',
+    'project_key_regex': 'issue',
+    'CatchExceptions': 'scripts',
+    'LazyGroup': 'scripts',
+    'jt': 'scripts',
+    'main': 'scripts',
+}
+__all__ = sorted(submodule_of)
+
+
+def __getattr__(name):
+    """Import a submodule, or a name defined by one, on first use.
+
+    Importing the jtlib package is cheap: the JIRA client library is imported
+    only when a module that needs it is used.
+    """
+    if name in submodule_list:
+        return importlib.import_module('jtlib.' + name)
+    if name in submodule_of:
+        return getattr(importlib.import_module('jtlib.' + submodule_of[name]), name)
+    raise AttributeError("module 'jtlib' has no attribute '{}'".format(name))
@@ -0,0 +1,171 @@
+# -*-coding:Utf-8 -*
+
+
+#--------------------------------------------------------------------------------
+# jtlib: cache.py
+#
+# Persistent issue cache.
+#--------------------------------------------------------------------------------
+# BSD 2-Clause License
+#
+# Copyright (c) 2018, Brian Minard
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#--------------------------------------------------------------------------------
+
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class IssueCache(object):
+    """Store issues on disk, keyed by issue key and update time stamp.
+
+    An issue is reused only while its update time stamp matches the one
+    reported by the JIRA server. Issues unused for max_age seconds are
+    discarded, as are the least recently used issues once the cache holds more
+    than max_entries issues.
+    """
+
+    file_name = 'issues.sqlite'
+
+    def __init__(self, directory, max_age = 30 * 24 * 60 * 60, max_entries = 250000):
+        """Open, or create, the cache.
+
+        Args:
+          directory: directory containing the cache file
+          max_age: seconds an unused issue is retained
+          max_entries: maximum number of issues retained
+        """
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(os.path.join(directory, self.file_name), check_same_thread = False)
+        with self._lock, self._connection:
+            self._connection.execute('''CREATE TABLE IF NOT EXISTS issue (
+                key TEXT NOT NULL, expand TEXT NOT NULL, updated TEXT NOT NULL,
+                accessed REAL NOT NULL, json TEXT NOT NULL, PRIMARY KEY (key, expand))''')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS issue_accessed ON issue (accessed)')
+        self.evict()
+
+    def get(self, key, updated, expand = None):
+        """Return the cached issue JSON or None if the issue is not cached or has changed."""
+        return self.get_many([ (key, updated), ], expand)[0]
+
+    def get_many(self, key_list, expand = None):
+        """Return the cached JSON of each issue, or None for issues not cached or changed.
+
+        The access time of every issue found is updated in a single transaction.
+
+        Args:
+          key_list: list of (issue key, update time stamp) pairs
+          expand: entities expanded in the cached issues
+        """
+        with self._lock, self._connection:
+            row_list = [ self._connection.execute('SELECT json FROM issue WHERE key = ? AND expand = ? AND updated = ?',
+                (key, expand or '', updated)).fetchone() for key, updated in key_list ]
+            accessed = time.time()
+            self._connection.executemany('UPDATE issue SET accessed = ? WHERE key = ? AND expand = ?',
+                [ (accessed, key, expand or '') for (key, _), row in zip(key_list, row_list) if row is not None ])
+        return [ json.loads(row[0]) if row is not None else None for row in row_list ]
+
+    def put(self, raw, expand = None):
+        """Store the issue JSON returned by the JIRA server."""
+        self.put_many([ raw, ], expand)
+
+    def put_many(self, raw_list, expand = None):
+        """Store the JSON of each issue returned by the JIRA server in a single transaction."""
+        accessed = time.time()
+        with self._lock, self._connection:
+            self._connection.executemany('INSERT OR REPLACE INTO issue VALUES (?, ?, ?, ?, ?)',
+                [ (raw['key'], expand or '', raw['fields']['updated'], accessed, json.dumps(raw)) for raw in raw_list ])
+
+    def evict(self):
+        """Discard old and least recently used issues."""
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM issue WHERE accessed < ?', (time.time() - self.max_age,))
+            self._connection.execute('''DELETE FROM issue WHERE rowid NOT IN (
+                SELECT rowid FROM issue ORDER BY accessed DESC LIMIT ?)''', (self.max_entries,))
+
+    def close(self):
+        """Apply the eviction policy and close the cache."""
+        self.evict()
+        self._connection.close()
+
+
+class ProjectCache(object):
+    """Store the project list of each JIRA server on disk.
+
+    A list is fresh for ttl seconds. Expired lists are kept with the ETag the
+    server provided, so that they can be revalidated instead of replaced.
+    """
+
+    def __init__(self, directory, ttl = 60 * 60):
+        """Open, or create, the cache.
+
+        Args:
+          directory: directory containing the cache files
+          ttl: seconds a project list is used without contacting the server
+        """
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.directory = directory
+        self.ttl = ttl
+
+    def _path(self, url):
+        digest = hashlib.sha1(url.rstrip('/').encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.directory, 'projects-{}.json'.format(digest))
+
+    def get(self, url):
+        """Return the cached entry for the server or None.
+
+        Returns: dictionary containing the project list (projects), its ETag
+          (etag), and whether it is fresh (fresh)
+        """
+        try:
+            with open(self._path(url), encoding = 'utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        entry['fresh'] = time.time() - entry['fetched'] < self.ttl
+        return entry
+
+    def put(self, url, projects, etag = None):
+        """Store the server's project list, replacing any earlier list."""
+        path = self._path(url)
+        temporary_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(temporary_path, 'w', encoding = 'utf-8') as f:
+            json.dump({ 'url': url, 'fetched': time.time(), 'etag': etag, 'projects': projects, }, f)
+        os.replace(temporary_path, path)
+
+    def touch(self, url):
+        """Mark the server's project list as fresh after a successful revalidation."""
+        entry = self.get(url)
+        if entry is not None:
+            self.put(url, entry['projects'], entry['etag'])
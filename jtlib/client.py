@@ -34,7 +34,22 @@
 #--------------------------------------------------------------------------------
 
 
+import asyncio
+import collections
+import concurrent.futures
+import datetime
+import functools
+import itertools
 import jira
+import jtlib.output as output
+import jtlib.parallel as parallel
+import jtlib.ratelimit as ratelimit
+import random
+import re
+import requests
+import requests.adapters
+import threading
+import time
 
 
 class InvalidQuery(Exception):
@@ -49,60 +64,595 @@ class InvalidUrl(Exception):
 
 class JiraServerError(Exception):
     """Exception identifying a JIRA (remote) server error."""
+
+    def __init__(self, message, status_code = None):
+        super(JiraServerError, self).__init__(message)
+        self.status_code = status_code
+
+
+class JiraTimeout(JiraServerError):
+    """Exception identifying a JIRA (remote) server that did not respond in time."""
     pass
 
 
+class PageSize(object):
+    """Number of issues requested in each search page.
+
+    The size never exceeds the number of issues the server returns in a page.
+    An adaptive size doubles while responses are fast and small, and halves
+    when responses are slow or large, or the server times out or fails. Sizes
+    that failed are not requested again.
+    """
+
+    minimum = 10 # Smallest adaptive page size.
+    maximum = 1000 # Largest adaptive page size.
+    target_latency = 2.0 # Seconds.
+    target_bytes = 4 * 1024 * 1024 # Response size.
+
+    def __init__(self, size, adaptive = False):
+        self.size = size
+        self.adaptive = adaptive
+        self._lock = threading.Lock()
+
+    def ranges(self, startAt, total):
+        """Return (startAt, size) pairs covering the remaining search results.
+
+        Each size is read when the pair is requested, so later pages reflect
+        adjustments made while earlier pages were fetched.
+        """
+        while startAt < total:
+            size = self.size
+            yield startAt, size
+            startAt += size
+
+    def record(self, requested, page, latency, response_bytes):
+        """Adjust the size using the outcome of a page request.
+
+        Args:
+          requested: number of issues requested
+          page: JSON search result returned by the server
+          latency: seconds taken by the request
+          response_bytes: size of the response
+        """
+        with self._lock:
+            if page['maxResults'] and page['maxResults'] < requested: # Server limit.
+                self.maximum = page['maxResults']
+                self.size = min(self.size, page['maxResults'])
+            elif not self.adaptive:
+                pass
+            elif latency > self.target_latency or response_bytes > self.target_bytes:
+                self.size = max(self.minimum, self.size // 2)
+            elif len(page['issues']) == requested and 2 * latency < self.target_latency and 2 * response_bytes < self.target_bytes:
+                self.size = min(self.maximum, 2 * self.size)
+
+    def can_shrink(self, excinfo, requested):
+        """Return True if a request for the number of issues that failed can be retried using a smaller size.
+
+        Server failures (HTTP 5xx) and time outs are assumed to be caused by
+        large pages.
+        """
+        transient = isinstance(excinfo, (JiraTimeout, requests.exceptions.Timeout)) or (getattr(excinfo, 'status_code', None) or 0) >= 500
+        with self._lock:
+            return self.adaptive and transient and (self.size > self.minimum or self.size < requested)
+
+    def shrink(self, excinfo, requested):
+        """Halve an adaptive size after a server failure.
+
+        The size never grows back to the size that failed.
+
+        Returns: True if the failed request should be retried using the new size
+        """
+        if not self.can_shrink(excinfo, requested):
+            return False
+        with self._lock:
+            if self.size >= requested: # Not yet shrunk by another page request.
+                self.size = max(self.minimum, requested // 2)
+            self.maximum = min(self.maximum, self.size)
+            return True
+
+
 class Jira(object):
     """Encapsulate JIRA client instantiation."""
 
     maximum_search_results = 50 # Number of issues returned in a search.
+    maximum_worklog_results = 1000 # Number of work logs returned in a request.
+    maximum_project_results = 50 # Number of projects returned in a project search.
+    maximum_changelog_results = 100 # Number of change histories returned in a request.
+    retry_status_codes = ( 429, 502, 503, 504, ) # HTTP status codes of failed requests worth retrying.
+    maximum_retry_delay = 60.0 # Seconds.
+    shard_size = 5000 # Largest number of issues in a search shard.
 
-    def __init__(self, url, **kwargs):
+    def __init__(self, url, cache = None, pool_size = None, timeout = None, max_retries = 3, backoff = 0.5,
+            compress = True, rate = None, burst = None, **kwargs):
         """Contruct the JIRA client object.
 
         Args:
           url: JIRA server URL
+          cache: issue cache (e.g., jtlib.cache.IssueCache) or None
+          pool_size: number of connections kept open to the server
+          timeout: seconds to wait for the server to respond, or None
+          max_retries: number of times a failed request is retried
+          backoff: seconds to wait before the first retry; doubled for each retry
+          compress: True to request compressed responses
+          rate: most requests per second made by all threads, or None
+          burst: most requests made at once without waiting for the rate
           kwargs: keyword arguments passed directly to client
         """
+        self.url = url
+        self._cache = cache
+        self._local = threading.local()
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._limiter = ratelimit.TokenBucket(rate, burst) if rate else None
+        self.request_hooks = list() # Called as hook(kind, latency, response_bytes, status, retries) after each request.
         try:
-            self._JIRA = jira.JIRA(url, kwargs)
+            self._JIRA = jira.JIRA(url, kwargs, timeout = timeout, max_retries = 0) # Retries are made by _request().
             assert isinstance(self._JIRA, jira.client.JIRA)
         except:
             raise InvalidUrl("Provided URL isn't a JIRA server.")
+        session = self._JIRA._session
+        if pool_size:
+            adapter = requests.adapters.HTTPAdapter(pool_connections = pool_size, pool_maxsize = pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        session.headers['Accept-Encoding'] = 'gzip, deflate' if compress else 'identity'
+        session.hooks['response'].append(self._record_response)
+
+    def _record_response(self, response, *args, **kwargs):
+        """Accumulate the size of responses received by the current thread."""
+        self._local.response_bytes = getattr(self._local, 'response_bytes', 0) + len(response.content)
+
+    def _retry_delay(self, excinfo, attempt):
+        """Return seconds to wait before retrying a failed request, or None to give up.
+
+        A server's Retry-After header is honoured. Otherwise, the delay grows
+        exponentially with random jitter so that parallel requests spread out.
+        """
+        if attempt >= self.max_retries:
+            return None
+        if isinstance(excinfo, jira.JIRAError):
+            if excinfo.status_code not in self.retry_status_codes:
+                return None
+            retry_after = excinfo.response.headers.get('Retry-After') if excinfo.response is not None else None
+            if retry_after and retry_after.strip().isdigit():
+                return min(float(retry_after), self.maximum_retry_delay)
+        delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+        return min(delay, self.maximum_retry_delay)
+
+    def _request(self, kind, function, *args, give_up = None, **kwargs):
+        """Call a JIRA client method, retrying transient failures.
+
+        The kind of request (e.g., search) is reported to the request hooks.
+
+        Throttled requests (HTTP 429), gateway and availability errors, time
+        outs and dropped connections are retried up to max_retries times,
+        unless give_up is provided and returns True for the failure.
+
+        If the client has a rate limit, every attempt waits its turn, and
+        throttled requests lower the rate.
+        """
+        attempt = 0
+        first_bytes = getattr(self._local, 'response_bytes', 0)
+        while True:
+            if self._limiter:
+                self._limiter.acquire()
+            start_time = time.time()
+            try:
+                result = function(*args, **kwargs)
+            except (jira.JIRAError, requests.exceptions.ConnectionError, requests.exceptions.Timeout) as excinfo:
+                delay = None if give_up and give_up(excinfo) else self._retry_delay(excinfo, attempt)
+                if self._limiter and 429 == getattr(excinfo, 'status_code', None):
+                    self._limiter.throttled(delay)
+                if delay is None:
+                    self._report(kind, start_time, first_bytes, getattr(excinfo, 'status_code', None) or 0, attempt)
+                    raise
+            else:
+                if self._limiter:
+                    self._limiter.succeeded()
+                self._report(kind, start_time, first_bytes, 200, attempt)
+                return result
+            time.sleep(delay)
+            attempt += 1
+
+    def _report(self, kind, start_time, first_bytes, status, retries):
+        """Call the request hooks for a completed request."""
+        if self.request_hooks:
+            response_bytes = getattr(self._local, 'response_bytes', 0) - first_bytes
+            for hook in self.request_hooks:
+                hook(kind, time.time() - start_time, response_bytes, status, retries)
 
     def projects(self):
         """Project accessor.
 
         Returns: list of JIRA projects host on the JIRA server
         """
-        return self._JIRA.projects()
+        return self._request('project', self._JIRA.projects)
+
+
+    def _get(self, kind, resource, params = None, etag = None):
+        """Request a REST API resource directly, bypassing resource construction.
+
+        Returns: the response
+        """
+        headers = { 'If-None-Match': etag, } if etag else {}
+        return self._request(kind, self._JIRA._session.get, self._JIRA._get_url(resource), params = params, headers = headers)
 
+    def project_list(self, etag = None):
+        """Return the key and name of each project hosted on the server.
 
-    def issue(self, key):
+        Unlike projects(), no project resources are constructed. Projects are
+        requested a page at a time from servers supporting project searches.
+
+        Provide the ETag of an earlier listing to revalidate it. An ETag is
+        only returned for listings obtained in a single request.
+
+        Returns: list of dictionaries containing each project's key and name,
+          or None if the earlier listing is unchanged, and the listing's ETag
+        """
+        summary = lambda project: { 'key': project['key'], 'name': project.get('name'), }
+        project_list = list()
+        startAt = 0
+        try:
+            while True:
+                response = self._get('project', 'project/search', { 'startAt': startAt, 'maxResults': self.maximum_project_results, },
+                    etag if 0 == startAt else None)
+                if 304 == response.status_code:
+                    return None, etag
+                page = response.json()
+                project_list.extend(summary(project) for project in page['values'])
+                startAt += len(page['values'])
+                if page.get('isLast', True) or not page['values']:
+                    break
+        except jira.JIRAError as excinfo:
+            if 404 != excinfo.status_code:
+                raise
+            response = self._get('project', 'project', etag = etag) # Servers predating project searches.
+            if 304 == response.status_code:
+                return None, etag
+            return [ summary(project) for project in response.json() ], response.headers.get('ETag')
+        single_page = 0 == page.get('startAt', 0) # The ETag of a later page doesn't cover the earlier ones.
+        return project_list, response.headers.get('ETag') if single_page else None
+
+    def issue(self, key, updated = None):
         """Return all fields for the issue with the specificed key.
 
         Use this method to collect time related information from a JIRA issue.
+
+        Provide the issue's update time stamp to permit use of a cached copy.
         """
-        return self._JIRA.issue(key)
+        if self._cache is None:
+            return self._request('issue', self._JIRA.issue, key)
+        if updated:
+            raw = self._cache.get(key, updated)
+            if raw:
+                return jira.resources.Issue(self._JIRA._options, self._JIRA._session, raw = raw)
+        issue = self._request('issue', self._JIRA.issue, key)
+        self._cache.put(issue.raw)
+        return issue
 
 
-    def search(self, jql_query):
-        """Search for issues using a JQL query.
+    def worklogs(self, key, raw = False):
+        """Return every work log recorded against the issue with the specified key.
 
-        Some JIRA issue information requires using the issue() method to obtain.
+        Work logs are requested a page at a time, so issues having more work
+        logs than a search result contains are returned in full. If raw is
+        True, the JSON representation of each work log is returned.
         """
         startAt = 0
         while True:
             try:
-                result = self._JIRA.search_issues(jql_query, startAt = startAt, maxResults = self.maximum_search_results)
+                result = self._request('worklog', self._JIRA._get_json, 'issue/{}/worklog'.format(key),
+                    params = { 'startAt': startAt, 'maxResults': self.maximum_worklog_results, })
             except jira.JIRAError as excinfo:
-                raise JiraServerError(str(excinfo.text) + '.')
-            except:
-                raise InvalidQuery("Issue search failed.")
-            assert isinstance(result, jira.client.ResultList)
-            if startAt >= result.total:
+                raise JiraServerError(str(excinfo.text) + '.', excinfo.status_code)
+            for worklog in result['worklogs']:
+                yield worklog if raw else jira.resources.Worklog(self._JIRA._options, self._JIRA._session, raw = worklog)
+            startAt += len(result['worklogs'])
+            if 0 == len(result['worklogs']) or startAt >= result['total']:
                 break
-            else:
-                for issue in result:
-                    yield issue # Assume lots of issues.
-                startAt += self.maximum_search_results
+
+
+    def changelog(self, key):
+        """Return the JSON representation of every change history of the issue with the specified key.
+
+        Histories are requested a page at a time, so issues having more
+        histories than a search result contains are returned in full. Servers
+        without paged changelogs return the whole changelog with the issue.
+        """
+        startAt = 0
+        while True:
+            try:
+                result = self._request('changelog', self._JIRA._get_json, 'issue/{}/changelog'.format(key),
+                    params = { 'startAt': startAt, 'maxResults': self.maximum_changelog_results, })
+            except jira.JIRAError as excinfo:
+                if 404 != excinfo.status_code or startAt:
+                    raise JiraServerError(str(excinfo.text) + '.', excinfo.status_code)
+                break
+            for history in result['values']:
+                yield history
+            startAt += len(result['values'])
+            if 0 == len(result['values']) or result.get('isLast') or startAt >= result['total']:
+                return
+        try:
+            issue = self._request('changelog', self._JIRA._get_json, 'issue/{}'.format(key),
+                params = { 'fields': 'created', 'expand': 'changelog', })
+        except jira.JIRAError as excinfo:
+            raise JiraServerError(str(excinfo.text) + '.', excinfo.status_code)
+        for history in issue['changelog']['histories']:
+            yield history
+
+    def _search_page(self, jql_query, startAt, maxResults, fields = None, expand = None, validate_query = True, page_size = None):
+        """Return the JSON representation of one page of search results.
+
+        Transient failures are retried for this page alone, unless the
+        adaptive page_size (a PageSize) can shrink instead.
+        """
+        give_up = (lambda excinfo: page_size.can_shrink(excinfo, maxResults)) if page_size else None
+        try:
+            page = self._request('search', self._JIRA.search_issues, jql_query, startAt = startAt, maxResults = maxResults,
+                fields = fields, expand = expand, validate_query = validate_query, json_result = True, give_up = give_up)
+        except jira.JIRAError as excinfo:
+            raise JiraServerError(str(excinfo.text) + '.', excinfo.status_code)
+        except requests.exceptions.Timeout:
+            raise JiraTimeout("JIRA server did not respond in time.")
+        except:
+            raise InvalidQuery("Issue search failed.")
+        assert isinstance(page, dict)
+        return page
+
+
+    def _search_range(self, jql_query, startAt, count, fields, expand, page_size, validate_query = True):
+        """Return up to count search results, using as many pages as needed.
+
+        If the client has an issue cache, each page is obtained with only the
+        update time stamp of each issue, without expanding entities. The issues
+        are then completed using complete_from_cache().
+
+        Returns: list of issue JSON representations and the total number of search results
+        """
+        search_expand = expand
+        if self._cache is not None:
+            fields = [ 'updated', ]
+            search_expand = None
+        issue_list = list()
+        total = startAt + count
+        while len(issue_list) < count and startAt + len(issue_list) < total:
+            requested = min(count - len(issue_list), page_size.size)
+            self._local.response_bytes = 0
+            start_time = time.time()
+            try:
+                page = self._search_page(jql_query, startAt + len(issue_list), requested, fields, search_expand, validate_query,
+                    page_size)
+            except JiraServerError as excinfo:
+                if page_size.shrink(excinfo, requested):
+                    continue
+                raise
+            page_size.record(requested, page, time.time() - start_time, self._local.response_bytes)
+            total = page['total']
+            if 0 == len(page['issues']):
+                break
+            issue_list.extend(page['issues'])
+        if self._cache is not None:
+            issue_list = self._complete_from_cache(issue_list, expand, page_size.size)
+        return issue_list, total
+
+
+    def _complete_from_cache(self, issue_list, expand, page_size):
+        """Replace issues containing only an update time stamp with complete issues.
+
+        Issues that are not cached, or have changed, are obtained using as few
+        searches as the page size permits. The server may return fewer issues
+        per page than for the first search, so each search is paged until every
+        issue is found or no more are returned.
+        """
+        raw_list = self._cache.get_many([ (issue['key'], issue['fields']['updated']) for issue in issue_list ], expand)
+        missing = [ (issue['id'], index) for index, issue in enumerate(issue_list) if raw_list[index] is None ]
+        for first in range(0, len(missing), page_size):
+            index_of = dict(missing[first:first + page_size])
+            missing_query = 'ID IN ({})'.format(','.join(index_of.keys()))
+            found = 0
+            while found < len(index_of):
+                page = self._search_page(missing_query, found, len(index_of) - found, None, expand)
+                self._cache.put_many(page['issues'], expand)
+                for issue in page['issues']:
+                    raw_list[index_of[issue['id']]] = issue
+                found += len(page['issues'])
+                if 0 == len(page['issues']) or found >= page['total']:
+                    break
+        return [ raw for raw in raw_list if raw is not None ] # Issues deleted since the first search are skipped.
+
+
+    def _release(self, issue_list, raw):
+        """Return each issue in the list, releasing it from the list as it is returned.
+
+        Issue resources are constructed one at a time, as they are returned,
+        so a page is never held both as JSON and as resources.
+        """
+        issue_list.reverse()
+        while issue_list:
+            issue = issue_list.pop()
+            yield issue if raw else jira.resources.Issue(self._JIRA._options, self._JIRA._session, raw = issue)
+
+
+    def search(self, jql_query, fields = None, expand = None, concurrency = 1, page_size = None, adaptive = False,
+            raw = False, startAt = 0, validate_query = True):
+        """Search for issues using a JQL query.
+
+        Some JIRA issue information requires using the issue() method to obtain.
+
+        Restrict the fields returned for each issue by providing a list of field
+        names. All fields are returned if no list is provided. The expand
+        argument is a comma-separated list of entities to expand (e.g.,
+        changelog).
+
+        The first page of results identifies the total number of issues. The
+        remaining pages are fetched using up to concurrency parallel requests.
+        Issues are returned in the order provided by the server.
+
+        Each page requests page_size issues, or maximum_search_results if no
+        size is provided. If adaptive is True, the page size is adjusted using
+        the server's response times and response sizes (see PageSize).
+
+        If the client has an issue cache, every issue field is returned. Only
+        issues changed since they were cached are obtained in full.
+
+        If raw is True, the JSON representation of each issue is returned as a
+        dictionary instead of an issue resource.
+
+        Search results before startAt are skipped, so an interrupted search can
+        be resumed.
+
+        The validate_query argument is passed to the server. Use 'warn' to
+        ignore issue keys that don't exist instead of failing the search.
+        """
+        page_size = PageSize(page_size or self.maximum_search_results, adaptive)
+        fetch_range = lambda page: self._search_range(jql_query, page[0], page[1], fields, expand, page_size, validate_query)
+        first_count = page_size.size
+        issue_list, total = fetch_range((startAt, first_count))
+        for issue in self._release(issue_list, raw):
+            yield issue
+        for issue_list, _ in parallel.ordered_map(fetch_range, page_size.ranges(startAt + first_count, total), concurrency):
+            for issue in self._release(issue_list, raw):
+                yield issue # Assume lots of issues.
+
+    def _count(self, jql_query):
+        """Return the number of issues matching a JQL query."""
+        return self._search_page(jql_query, 0, 1, [ 'created', ])['total']
+
+    def _created_minute(self, jql_query, order):
+        """Return the creation minute of the first issue in the order, or None if no issue matches.
+
+        Minutes are counted from the epoch, in UTC.
+        """
+        issue_list = self._search_page('{} ORDER BY CREATED {}'.format(jql_query, order), 0, 1, [ 'created', ])['issues']
+        if not issue_list:
+            return None
+        created = datetime.datetime.strptime(issue_list[0]['fields']['created'], output.time_stamp_format)
+        return int(created.timestamp()) // 60
+
+    def _shards(self, jql_query, order_by, shard_size):
+        """Return the JQL query of each creation time window containing issues.
+
+        Windows are split in half until they contain at most shard_size issues
+        or are one minute wide. JQL interprets time stamps in the user's time
+        zone, so the first and last windows are widened by a day.
+        """
+        first = self._created_minute(jql_query, 'ASC')
+        if first is None:
+            return
+        last = self._created_minute(jql_query, 'DESC')
+        minute = lambda value: datetime.datetime.fromtimestamp(60 * value, datetime.timezone.utc).strftime('%Y/%m/%d %H:%M')
+        window_query = lambda start, end: '({}) AND CREATED >= "{}" AND CREATED < "{}"{}'.format(jql_query, minute(start),
+            minute(end), order_by)
+        window_list = [ (first - 24 * 60, last + 24 * 60 + 1), ] # Stack of windows, earliest on top.
+        while window_list:
+            start, end = window_list.pop()
+            query = window_query(start, end)
+            total = self._count(query)
+            if total <= shard_size or end - start <= 1:
+                if total:
+                    yield query
+                continue
+            middle = (start + end) // 2
+            window_list.extend([ (middle, end), (start, middle), ])
+
+    def sharded_search(self, jql_query, fields = None, expand = None, concurrency = 1, page_size = None, adaptive = False,
+            raw = False, shard_size = None):
+        """Search for issues using a JQL query split into creation time windows.
+
+        Deep search result pages are slow to obtain, so each window (shard)
+        holds at most shard_size issues, or shard_size if no size is provided.
+        Window sizes are found by counting the issues in each window. Up to
+        concurrency shards are obtained in parallel, each a page at a time.
+
+        Issues are returned in creation time window order, and in the order of
+        the query's ORDER BY clause within each window. An issue is returned
+        only once, even if it moves between windows during the search. Other
+        arguments are as for search().
+        """
+        shard_size = shard_size or self.shard_size
+        page_size = PageSize(page_size or self.maximum_search_results, adaptive)
+        jql_query, order_by = (re.split(r'\s+ORDER\s+BY\s+', jql_query, maxsplit = 1, flags = re.IGNORECASE) + [ '', ])[:2]
+        order_by = ' ORDER BY ' + order_by if order_by else ''
+        fetch_shard = lambda shard_query: self._search_range(shard_query, 0, float('inf'), fields, expand, page_size)[0]
+        key_set = set()
+        for issue_list in parallel.ordered_map(fetch_shard, self._shards(jql_query, order_by, shard_size), concurrency):
+            issue_list = [ issue for issue in issue_list if issue['key'] not in key_set ]
+            key_set.update(issue['key'] for issue in issue_list)
+            for issue in self._release(issue_list, raw):
+                yield issue
+
+
+class AsyncJira(object):
+    """Asyncio counterpart to the Jira class.
+
+    Requests are made by a Jira client on a pool of worker threads, so they
+    never block the event loop. Up to concurrency requests are in flight at
+    any one time. Errors are reported using the same exceptions as Jira.
+    """
+
+    def __init__(self, client, concurrency = 4):
+        """Wrap a Jira client; use create() to construct both at once."""
+        self._client = client
+        self.concurrency = concurrency
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers = concurrency)
+
+    @classmethod
+    async def create(cls, url, concurrency = 4, **kwargs):
+        """Construct the client without blocking the event loop.
+
+        Args:
+          url: JIRA server URL
+          concurrency: maximum number of requests in flight
+          kwargs: keyword arguments passed directly to Jira
+        """
+        loop = asyncio.get_event_loop()
+        client = await loop.run_in_executor(None, functools.partial(Jira, url, **kwargs))
+        return cls(client, concurrency)
+
+    async def _call(self, function, *args):
+        """Run a blocking call on the worker threads."""
+        return await asyncio.get_event_loop().run_in_executor(self._executor, functools.partial(function, *args))
+
+    async def projects(self):
+        """Project accessor (see Jira.projects())."""
+        return await self._call(self._client.projects)
+
+    async def issue(self, key, updated = None):
+        """Return all fields for the issue with the specified key (see Jira.issue())."""
+        return await self._call(self._client.issue, key, updated)
+
+    async def search(self, jql_query, fields = None, expand = None, page_size = None, adaptive = False, raw = False):
+        """Search for issues using a JQL query (see Jira.search()).
+
+        Use with async for. While the caller processes one page of issues, the
+        following pages are already being requested.
+        """
+        page_size = PageSize(page_size or self._client.maximum_search_results, adaptive)
+        fetch_range = lambda page: asyncio.ensure_future(
+            self._call(self._client._search_range, jql_query, page[0], page[1], fields, expand, page_size))
+        first_count = page_size.size
+        issue_list, total = await fetch_range((0, first_count))
+        for issue in self._client._release(issue_list, raw):
+            yield issue
+        ranges = page_size.ranges(first_count, total)
+        pending = collections.deque(fetch_range(page) for page in itertools.islice(ranges, self.concurrency))
+        try:
+            while pending:
+                issue_list, _ = await pending.popleft()
+                pending.extend(fetch_range(page) for page in itertools.islice(ranges, 1))
+                for issue in self._client._release(issue_list, raw):
+                    yield issue
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def close(self):
+        """Release the worker threads."""
+        self._executor.shutdown(wait = False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
@@ -36,7 +36,12 @@
 
 from click.testing import CliRunner
 import click
+import jira
+import jtlib.client
+import jtlib.mockserver
 import pytest
+import requests
+import time
 
 
 @pytest.fixture(scope = 'module')
@@ -71,3 +76,130 @@ command_list = [
 def command(request):
     """Different JIRA tool commands."""
     return request.param
+
+
+class FakeJIRA(jira.client.JIRA):
+    """Stand-in for the JIRA client serving a synthetic project.
+
+    Issues omit the time tracking field from search results whenever the
+    search_omits list names the issue number. Issue number N has N % 4 work
+    logs, of which search results contain at most two.
+    """
+
+    inline_worklog_limit = 2
+
+    server_maximum = 1000 # Largest page returned.
+    failure_maximum = None # Pages larger than this fail.
+
+    def __init__(self, issue_count, delay = 0.0, search_omits = ()):
+        self._options = { 'server': 'http://localhost', }
+        self._session = requests.Session()
+        self.issue_count = issue_count
+        self.delay = delay
+        self.search_omits = search_omits
+        self.updated = dict() # Issue number to update time stamp.
+        self.failures = dict() # Search page start to list of (HTTP status, Retry-After) failures.
+        self.search_calls = list()
+        self.search_queries = list()
+        self.search_fields = list()
+        self.issue_calls = list()
+        self.worklog_calls = list()
+
+    def make_raw_worklogs(self, number):
+        """Return the JSON representation of the issue number's work logs."""
+        return [ {
+            'id': '{}'.format(100 * number + day),
+            'updateAuthor': { 'name': 'user{}'.format(day), },
+            'started': '2018-01-0{}T09:00:00.000+0000'.format(day),
+            'timeSpent': '{}h'.format(day),
+            'timeSpentSeconds': 3600 * day,
+        } for day in range(1, number % 4 + 1) ]
+
+    def make_raw_issue(self, number):
+        """Return the JSON representation of the issue number."""
+        return {
+            'id': '{}'.format(10000 + number),
+            'key': 'FAKE-{}'.format(number),
+            'fields': {
+                'updated': self.updated.get(number, '2018-02-01T10:00:00.000+0000'),
+                'issuetype': { 'name': 'Bug', },
+                'status': { 'name': 'Open', },
+                'summary': 'Issue {}'.format(number),
+                'created': '2018-01-02T15:48:51.377+0000',
+                'assignee': { 'name': 'user{}'.format(number % 3), 'displayName': 'User {}'.format(number % 3), } if number % 2 else None,
+                'customfield_10010': { 'id': '{}'.format(number % 3), 'value': 'Team {}'.format(number % 3), },
+                'timetracking': { 'originalEstimate': '{}h'.format(number), } if number % 2 else {},
+                'worklog': {
+                    'startAt': 0,
+                    'maxResults': self.inline_worklog_limit,
+                    'total': number % 4,
+                    'worklogs': self.make_raw_worklogs(number)[:self.inline_worklog_limit],
+                },
+            },
+        }
+
+    def _get_json(self, path, params = None):
+        key = path.split('/')[1]
+        self.worklog_calls.append(key)
+        worklogs = self.make_raw_worklogs(int(key.split('-')[1]))
+        startAt = params['startAt']
+        return {
+            'startAt': startAt,
+            'maxResults': params['maxResults'],
+            'total': len(worklogs),
+            'worklogs': worklogs[startAt:startAt + params['maxResults']],
+        }
+
+    def make_issue(self, raw):
+        """Return the issue resource for the JSON representation."""
+        return jira.resources.Issue({ 'server': 'http://localhost', }, None, raw = raw)
+
+    def issue(self, key):
+        self.issue_calls.append(key)
+        return self.make_issue(self.make_raw_issue(int(key.split('-')[1])))
+
+    def search_issues(self, jql_str, startAt = 0, maxResults = 50, fields = None, expand = None, json_result = False, **kwargs):
+        self.search_calls.append((startAt, maxResults))
+        self.search_queries.append(jql_str)
+        self.search_fields.append(fields)
+        if self.delay:
+            time.sleep(self.delay)
+        if self.failures.get(startAt):
+            status_code, retry_after = self.failures[startAt].pop(0)
+            response = requests.Response()
+            response.status_code = status_code
+            if retry_after:
+                response.headers['Retry-After'] = retry_after
+            raise jira.JIRAError('Failure', status_code = status_code, response = response)
+        if self.failure_maximum and maxResults > self.failure_maximum:
+            raise jira.JIRAError('Service unavailable', status_code = 503)
+        maxResults = min(maxResults, self.server_maximum)
+        if jql_str.startswith('ID IN '):
+            number_list = [ int(id) - 10000 for id in jql_str[7:-1].split(',') ]
+        else:
+            number_list = range(startAt + 1, min(startAt + maxResults, self.issue_count) + 1)
+        issues = list()
+        for number in number_list:
+            raw = self.make_raw_issue(number)
+            if fields:
+                raw['fields'] = { name: value for name, value in raw['fields'].items() if name in fields }
+            if number in self.search_omits:
+                raw['fields'].pop('timetracking', None)
+            issues.append(raw)
+        if json_result:
+            return { 'startAt': startAt, 'maxResults': maxResults, 'total': self.issue_count, 'issues': issues, }
+        return jira.client.ResultList([ self.make_issue(raw) for raw in issues ], startAt, maxResults, self.issue_count)
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    """Return a JIRA client backed by a synthetic project of 137 issues."""
+    monkeypatch.setattr(jira, 'JIRA', lambda url, options, **kwargs: FakeJIRA(137))
+    return jtlib.client.Jira('http://localhost', backoff = 0.0)
+
+
+@pytest.fixture(scope = 'module')
+def mock_server():
+    """Return a local JIRA server serving synthetic projects."""
+    with jtlib.mockserver.MockJiraServer({ 'MOCK': 120, 'SMALL': 3, }) as server:
+        yield server
@@ -0,0 +1,303 @@
+# -*-coding:Utf-8 -*
+
+
+#--------------------------------------------------------------------------------
+# jtlib: daemon.py
+#
+# Daemon command interface for JIRA tool group.
+#--------------------------------------------------------------------------------
+# BSD 2-Clause License
+#
+# Copyright (c) 2018, Brian Minard
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#--------------------------------------------------------------------------------
+
+
+import click
+import io
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+import threading
+import traceback
+
+
+frame_header = struct.Struct('!cI') # Channel and payload length of each response frame.
+stdout_channel = b'1'
+stderr_channel = b'2'
+exit_channel = b'x'
+busy_channel = b'b' # Sent instead of output when another command is running.
+connect_timeout = 1.0 # Seconds a forwarding process waits for the daemon to accept its command.
+local_argument_list = [ '-', 'daemon', ] # Arguments of commands that are never forwarded.
+
+
+def is_local(argument_list):
+    """Return True if the command must not be forwarded (e.g., it reads standard input)."""
+    return any(argument in local_argument_list or argument.endswith('=-') for argument in argument_list)
+
+
+class FrameWriter(io.RawIOBase):
+    """Binary stream sending everything written to it as frames of a channel."""
+
+    def __init__(self, connection, channel):
+        self._connection = connection
+        self._channel = channel
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._connection.sendall(frame_header.pack(self._channel, len(data)) + bytes(data))
+        return len(data)
+
+
+def receive(stream, size):
+    """Return size bytes read from the stream, or None if the stream ends first."""
+    data = stream.read(size)
+    return data if len(data) == size else None
+
+
+class Daemon(object):
+    """Run jt commands received on a Unix socket, one at a time.
+
+    JIRA clients are kept between commands, one for each server URL and set
+    of connection options, together with their connection pools and caches.
+    Commands run in the working directory of the process forwarding them.
+    Their output is returned as stdout, stderr and exit status frames.
+
+    Commands replace the process's standard streams and working directory, so
+    only one runs at a time, on a worker thread. Commands received meanwhile
+    are refused with a busy frame, so that they run in the forwarding process
+    instead of waiting.
+    """
+
+    poll_interval = 0.2 # Seconds between checks for stop().
+
+    def __init__(self, path, command):
+        """Args:
+          path: Unix socket path
+          command: jt group command
+        """
+        self.path = path
+        self.command = command
+        self._client_of = dict()
+        self._close_list = list()
+        self._stopped = threading.Event()
+        self._idle = threading.Event() # Cleared while a command runs.
+        self._idle.set()
+        if os.path.exists(path):
+            if is_listening(path):
+                raise click.UsageError("A daemon is already listening on {}.".format(path))
+            os.remove(path) # Left by a daemon that didn't stop cleanly.
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o077) # Only the owner may use the daemon's credentials.
+        try:
+            self._listener.bind(path)
+        finally:
+            os.umask(umask)
+        self._listener.listen(64)
+        self._listener.settimeout(self.poll_interval)
+
+    def add(self, key, client):
+        """Reuse the client for commands with the specified connection options."""
+        self._client_of[key] = client
+
+    def client(self, key, connect):
+        """Return the client for the connection options, calling connect() if there is none.
+
+        connect() returns the client and a function closing it, or None.
+        """
+        if key not in self._client_of:
+            client, close = connect()
+            if close:
+                self._close_list.append(close)
+            self._client_of[key] = client
+        return self._client_of[key]
+
+    def serve(self):
+        """Run commands until stop() is called."""
+        worker = None
+        while not self._stopped.is_set():
+            try:
+                connection, _ = self._listener.accept()
+            except socket.timeout:
+                continue
+            if not self._idle.is_set():
+                self.refuse(connection)
+                continue
+            self._idle.clear()
+            worker = threading.Thread(target = self.run, args = (connection,), daemon = True)
+            worker.start()
+        if worker is not None:
+            worker.join()
+
+    def run(self, connection):
+        """Run the command received on the connection, then close it."""
+        with connection:
+            connection.settimeout(None)
+            try:
+                self.handle(connection)
+            except Exception: # Keep serving other commands.
+                traceback.print_exc()
+            finally:
+                self._idle.set()
+
+    def refuse(self, connection):
+        """Tell the forwarding process to run its command itself."""
+        with connection:
+            connection.settimeout(self.poll_interval)
+            try:
+                if connection.makefile('rb').readline(): # Not closed without a command (e.g., by is_listening()).
+                    connection.sendall(frame_header.pack(busy_channel, 0))
+            except OSError: # The forwarding process has gone.
+                pass
+
+    def handle(self, connection):
+        """Run the command received on the connection."""
+        line = connection.makefile('rb').readline()
+        if not line: # Closed without a command (e.g., by is_listening()).
+            return
+        request = json.loads(line.decode('utf-8'))
+        stdout = io.TextIOWrapper(io.BufferedWriter(FrameWriter(connection, stdout_channel)), encoding = 'utf-8')
+        stderr = io.TextIOWrapper(io.BufferedWriter(FrameWriter(connection, stderr_channel)), encoding = 'utf-8',
+            write_through = True)
+        saved = sys.stdin, sys.stdout, sys.stderr, os.getcwd()
+        status = 0
+        try:
+            sys.stdin, sys.stdout, sys.stderr = io.StringIO(), stdout, stderr
+            os.chdir(request['cwd'])
+            self.command(args = request['argv'], prog_name = 'jt', obj = { 'daemon': self, })
+        except SystemExit as excinfo:
+            status = excinfo.code if isinstance(excinfo.code, int) else 1
+        finally:
+            sys.stdin, sys.stdout, sys.stderr = saved[:3]
+            os.chdir(saved[3])
+            self._idle.set() # Before the exit status, so that the next command isn't refused.
+        try:
+            stdout.flush()
+            stderr.flush()
+            connection.sendall(frame_header.pack(exit_channel, 4) + struct.pack('!i', status))
+        except OSError: # The forwarding process has gone.
+            pass
+
+    def stop(self):
+        """Stop serving once the current command completes."""
+        self._stopped.set()
+
+    def close(self):
+        """Close the socket and the clients created for commands."""
+        self._listener.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        for close in self._close_list:
+            close()
+
+
+def is_listening(path):
+    """Return True if a daemon accepts connections on the Unix socket."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(path)
+        return True
+    except OSError:
+        return False
+
+
+def forward(path, argument_list):
+    """Run jt's arguments on the daemon listening on the Unix socket.
+
+    The daemon's output is copied to standard output and standard error.
+
+    Returns: the command's exit status, or None if no daemon is listening,
+      the daemon is running another command or the command must run locally
+    """
+    if is_local(argument_list):
+        return None
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.settimeout(connect_timeout)
+    try:
+        connection.connect(path)
+    except OSError:
+        connection.close()
+        return None
+    connection.settimeout(None)
+    with connection:
+        stream_of = { stdout_channel: sys.stdout.buffer, stderr_channel: sys.stderr.buffer, }
+        sys.stdout.flush()
+        request = { 'argv': list(argument_list), 'cwd': os.getcwd(), }
+        connection.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        stream = connection.makefile('rb')
+        while True:
+            header = receive(stream, frame_header.size)
+            if header is None:
+                break
+            channel, size = frame_header.unpack(header)
+            if busy_channel == channel:
+                return None
+            payload = receive(stream, size)
+            if payload is None:
+                break
+            if exit_channel == channel:
+                sys.stdout.buffer.flush()
+                return struct.unpack('!i', payload)[0]
+            stream_of[channel].write(payload)
+            if stderr_channel == channel:
+                sys.stderr.buffer.flush()
+    click.echo("The daemon stopped before the command completed.", err = True)
+    return 1
+
+
+@click.command()
+@click.option('--socket', 'socket_path', help = 'Unix socket on which commands are received.', envvar = 'JT_SOCKET',
+    type = click.Path(dir_okay = False), required = True)
+@click.pass_context
+def main(ctx, socket_path):
+    """Run forwarded jt commands using warm JIRA clients.
+
+    When the JT_SOCKET environment variable names the daemon's SOCKET, jt
+    forwards its commands to the daemon instead of running them, saving the
+    time needed to start, connect and authenticate. jt runs the command itself
+    if no daemon is listening. Commands reading standard input are never
+    forwarded.
+
+    Commands run one at a time, using the daemon's environment, in the working
+    directory of the forwarding process. A command forwarded while another is
+    running is run by jt itself, without waiting for the daemon, as is one the
+    daemon doesn't accept within a second. The daemon's JIRA client is reused by
+    commands for the same server with the same options. Other servers and
+    options get their own client, which is also kept. Stop the daemon with an
+    interrupt or termination signal.
+    """
+    daemon = Daemon(socket_path, ctx.find_root().command)
+    daemon.add(ctx.obj['connection'], ctx.obj['jira client'])
+    signal.signal(signal.SIGTERM, lambda *args: daemon.stop())
+    try:
+        daemon.serve()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.close()
@@ -35,11 +35,17 @@
 
 
 import click
-import csv
-import jira
+import collections
+import datetime
+import jtlib.output as output
+import jtlib.parallel as parallel
+import jtlib.stats
+import json
+import os
 import re
-import sys
+import time
 import types
+import urllib.parse
 
 
 project_key_regex = re.compile(r"""(?P<project_key>^[A-Z][A-Z]+)$""") # Default project key for JIRA Server 7.1.
@@ -65,34 +71,335 @@ def canonify_value(field, attribute):
         return 'N/A'
 
 
-def emit_issue_fields(ctx, issue_list):
-    """Print top-level Policy Holder issue fields."""
-    writer = csv.writer(sys.stdout)
-    writer.writerow([ 'Issue key', 'Issue Type', 'Status', 'Summary', 'Created',
-        'Original Estimate', 'Remaining Estimate',
-    ])
-    for item in issue_list:
-        assert isinstance(item, jira.resources.Issue)
-        issue = ctx.obj['jira client'].issue(item.key)
-        writer.writerow(map(lambda x: canonify_value(*x), [ (issue, 'key'),
-            (((issue, 'fields'), 'issuetype'), 'name'), (((issue, 'fields'), 'status'), 'name'),
-            ((issue, 'fields'), 'summary'), ((issue, 'fields'), 'created'),
-            (((issue, 'fields'), 'timetracking'), 'originalEstimate'),
-            (((issue, 'fields'), 'timetracking'), 'remainingEstimate'),
-        ]))
-
-
-def emit_worklog_fields(ctx, issue_list):
-    """Print worklog fields."""
-    writer = csv.writer(sys.stdout)
-    writer.writerow([ 'Issue key', 'Author', 'Started', 'Time Spent', ])
-    for issue in issue_list:
-        assert isinstance(issue, jira.resources.Issue)
-        for worklog in ctx.obj['jira client'].issue(issue.key).fields.worklog.worklogs:
-            writer.writerow(map(lambda x: canonify_value(*x), [ (issue, 'key'),
-                ((worklog, 'updateAuthor'), 'name'), (worklog, 'started'),
-                (worklog, 'timeSpent'),
-            ]))
+def compile_row(path_list, missing = 'N/A'):
+    """Compile a list of dotted paths into a function extracting a row of values.
+
+    Each path names a value in a JSON object (e.g., 'fields.status.name'). The
+    compiled function takes a JSON object and returns the list of values named
+    by the paths, with missing in place of missing or null values. Paths sharing
+    a prefix share its lookups, so each object is traversed once per row.
+    """
+    code = [ 'def row(value_0):', ]
+    variable_of = { (): 'value_0', }
+    cell_list = list()
+    for path in path_list:
+        name_list = tuple(path.split('.'))
+        for depth in range(1, len(name_list)):
+            prefix = name_list[:depth]
+            if prefix not in variable_of:
+                variable_of[prefix] = 'value_{}'.format(len(variable_of))
+                code.append('    {} = {}.get({!r})'.format(variable_of[prefix], variable_of[prefix[:-1]], prefix[-1]))
+                code.append('    if {}.__class__ is not dict: {} = empty'.format(variable_of[prefix], variable_of[prefix]))
+        cell = 'cell_{}'.format(len(cell_list))
+        code.append('    {} = {}.get({!r})'.format(cell, variable_of[name_list[:-1]], name_list[-1]))
+        cell_list.append(cell)
+    code.append('    return [ {} ]'.format(', '.join("{0} if {0} is not None else missing".format(cell) for cell in cell_list)))
+    namespace = { 'empty': dict(), 'missing': missing, }
+    exec('\n'.join(code), namespace)
+    return namespace['row']
+
+
+issue_column_list = [ # Column heading and issue value.
+    ('Issue key', 'key'),
+    ('Issue Type', 'fields.issuetype.name'),
+    ('Status', 'fields.status.name'),
+    ('Summary', 'fields.summary'),
+    ('Created', 'fields.created'),
+    ('Original Estimate', 'fields.timetracking.originalEstimate'),
+    ('Remaining Estimate', 'fields.timetracking.remainingEstimate'),
+]
+issue_field_list = [ 'issuetype', 'status', 'summary', 'created', 'timetracking', ] # Fields needed by emit_issue_fields().
+time_stamp_path_list = [ 'fields.created', 'fields.updated', 'fields.resolutiondate', 'started', 'created', ] # Values stored as time stamps by typed output formats.
+issue_attribute_list = [ 'id', 'key', 'self', ] # Issue values that are not fields.
+field_value_path_of = { # Value printed for fields containing an object, unless a path is specified.
+    'assignee': 'name',
+    'creator': 'name',
+    'issuetype': 'name',
+    'priority': 'name',
+    'project': 'key',
+    'reporter': 'name',
+    'resolution': 'name',
+    'status': 'name',
+}
+
+
+def projection_columns(field_spec_list):
+    """Return the columns and search fields of a field projection.
+
+    Each field specification is an issue field name, optionally followed by a
+    dotted path into the field's value (e.g., 'assignee.displayName'). The
+    specification is used as the column heading.
+
+    Returns: list of (heading, path) columns and list of field names to search for
+    """
+    column_list = list()
+    field_list = list()
+    for field_spec in field_spec_list:
+        name_list = field_spec.split('.')
+        if name_list[0] in issue_attribute_list:
+            column_list.append((field_spec, field_spec))
+            continue
+        if 1 == len(name_list) and name_list[0] in field_value_path_of:
+            name_list.append(field_value_path_of[name_list[0]])
+        column_list.append((field_spec, '.'.join([ 'fields', ] + name_list)))
+        if name_list[0] not in field_list:
+            field_list.append(name_list[0])
+    return column_list, field_list
+
+
+def output_columns(column_list):
+    """Return the (heading, type) pair of each (heading, path) column."""
+    return [ (heading, 'timestamp' if path in time_stamp_path_list else 'string') for heading, path in column_list ]
+
+
+def raw_issue(issue):
+    """Return the JSON representation of an issue resource or of a raw search result."""
+    return issue if isinstance(issue, dict) else issue.raw
+
+
+def has_fields(issue, field_list):
+    """Return True if the issue returned by a search contains every field."""
+    fields = raw_issue(issue).get('fields', dict())
+    return all(field in fields for field in field_list)
+
+
+def emit_issue_fields(ctx, issue_list, output_options = None, column_list = None, field_list = None, written = None):
+    """Print top-level Policy Holder issue fields.
+
+    Issues are issue resources or their JSON representation, and are
+    expected to contain the fields in field_list. An issue missing any of
+    these is obtained again from the server.
+
+    The column_list and field_list default to issue_column_list and
+    issue_field_list. Rows are written as CSV to standard output unless
+    output_options provides other arguments to output.open_writer().
+
+    If provided, written(issue, writer) is called once each issue is written.
+    If ctx.obj contains 'stats', the time spent obtaining issues (fetch),
+    extracting rows (extract) and writing them (write) is recorded.
+    """
+    stats = ctx.obj.get('stats')
+    column_list = column_list or issue_column_list
+    field_list = field_list if field_list is not None else issue_field_list
+    with output.open_writer(output_columns(column_list), **(output_options or dict())) as writer:
+        row = jtlib.stats.timed(stats, 'extract', compile_row([ path for _, path in column_list ], writer.missing))
+        write = jtlib.stats.timed(stats, 'write', writer.write)
+        for item in jtlib.stats.timed_iterable(stats, 'fetch', issue_list):
+            issue = raw_issue(item)
+            if not has_fields(issue, field_list):
+                issue = ctx.obj['jira client'].issue(issue['key']).raw
+            write(row(issue))
+            if written:
+                written(item, writer)
+
+
+worklog_column_list = [ # Column heading and work log value.
+    ('Author', 'updateAuthor.name'),
+    ('Started', 'started'),
+    ('Time Spent', 'timeSpent'),
+]
+worklog_field_list = [ 'worklog', ] # Fields needed by emit_worklog_fields().
+
+
+def issue_worklogs(ctx, issue):
+    """Return the JSON representation of the issue work logs.
+
+    Search results contain a limited number of work logs. Obtain them from the
+    server only if the search result is incomplete.
+    """
+    issue = raw_issue(issue)
+    worklog = issue.get('fields', dict()).get('worklog')
+    if worklog and len(worklog['worklogs']) >= worklog['total']:
+        return worklog['worklogs']
+    return list(ctx.obj['jira client'].worklogs(issue['key'], raw = True))
+
+
+def emit_worklog_fields(ctx, issue_list, concurrency = 1, worklog_id = False, output_options = None, written = None):
+    """Print worklog fields.
+
+    Work logs for up to concurrency issues are obtained in parallel. Rows are
+    printed in issue order as soon as each issue's work logs are available.
+
+    Add a column containing the work log identifier if worklog_id is True.
+    Output and statistics are written as for emit_issue_fields().
+    """
+    stats = ctx.obj.get('stats')
+    column_list = worklog_column_list + ([ ('Worklog Id', 'id'), ] if worklog_id else [])
+    with output.open_writer(output_columns([ ('Issue key', 'key'), ] + column_list), **(output_options or dict())) as writer:
+        row = jtlib.stats.timed(stats, 'extract', compile_row([ path for _, path in column_list ], writer.missing))
+        write = jtlib.stats.timed(stats, 'write', writer.write)
+        fetch_worklogs = lambda issue: (issue, issue_worklogs(ctx, issue))
+        worklogs_of_issues = parallel.ordered_map(fetch_worklogs, issue_list, concurrency)
+        for issue, worklog_list in jtlib.stats.timed_iterable(stats, 'fetch', worklogs_of_issues):
+            key = raw_issue(issue)['key']
+            for worklog in worklog_list:
+                write([ key, ] + row(worklog))
+            if written:
+                written(issue, writer)
+
+
+changelog_item_column_list = [ # Column heading and change history item value.
+    ('Field', 'field'),
+    ('From', 'fromString'),
+    ('To', 'toString'),
+]
+changelog_history_column_list = [ # Column heading and change history value.
+    ('Author', 'author.name'),
+    ('Changed', 'created'),
+]
+changelog_field_list = [ 'created', ] # Fields needed by emit_changelog_fields(); the changelog is expanded.
+
+
+def issue_changelog(ctx, issue):
+    """Return the JSON representation of the issue change histories.
+
+    Search results contain a limited number of histories. Obtain them from the
+    server only if the search result is incomplete.
+    """
+    issue = raw_issue(issue)
+    changelog = issue.get('changelog')
+    if changelog and len(changelog['histories']) >= changelog['total']:
+        return changelog['histories']
+    return list(ctx.obj['jira client'].changelog(issue['key']))
+
+
+def emit_changelog_fields(ctx, issue_list, concurrency = 1, history_id = False, output_options = None, written = None):
+    """Print a row for each field changed in each issue change history.
+
+    Histories of up to concurrency issues are obtained in parallel. Rows are
+    printed in issue order, and in the order returned by the server for each
+    issue.
+
+    Add a column containing the history identifier if history_id is True.
+    Output and statistics are written as for emit_issue_fields().
+    """
+    stats = ctx.obj.get('stats')
+    history_column_list = changelog_history_column_list + ([ ('History Id', 'id'), ] if history_id else [])
+    column_list = [ ('Issue key', 'key'), ] + changelog_item_column_list + history_column_list
+    with output.open_writer(output_columns(column_list), **(output_options or dict())) as writer:
+        item_row = jtlib.stats.timed(stats, 'extract', compile_row([ path for _, path in changelog_item_column_list ], writer.missing))
+        history_row = jtlib.stats.timed(stats, 'extract', compile_row([ path for _, path in history_column_list ], writer.missing))
+        write = jtlib.stats.timed(stats, 'write', writer.write)
+        fetch_changelog = lambda issue: (issue, issue_changelog(ctx, issue))
+        changelogs_of_issues = parallel.ordered_map(fetch_changelog, issue_list, concurrency)
+        for issue, history_list in jtlib.stats.timed_iterable(stats, 'fetch', changelogs_of_issues):
+            key = raw_issue(issue)['key']
+            for history in history_list:
+                history_values = history_row(history)
+                for item in history['items']:
+                    write([ key, ] + item_row(item) + history_values)
+            if written:
+                written(issue, writer)
+
+
+class Watermark(object):
+    """Start time of the previous incremental export.
+
+    Issues updated while an export runs may or may not be returned by it, so
+    the next export returns every issue updated since the previous one
+    started. The start time is kept in a JSON state file between runs.
+    """
+
+    overlap = datetime.timedelta(minutes = 10) # Allowance for differences between the local and server clocks.
+
+    def __init__(self, path):
+        self.path = path
+        self.since = None
+        if os.path.exists(path):
+            with open(path) as state:
+                state = json.load(state)
+            since = state.get('started') or state.get('updated') # Earlier state files recorded the latest update.
+            if since:
+                self.since = datetime.datetime.strptime(since, output.time_stamp_format) - self.overlap
+        self.started = datetime.datetime.now(datetime.timezone.utc)
+
+    def clause(self):
+        """Return a JQL clause selecting issues updated since the previous export started.
+
+        JQL interprets time stamps in the user's time zone and only to the
+        minute, so the clause starts a day early. Use filter() to discard the
+        issues that were already exported.
+        """
+        if self.since is None:
+            return None
+        since = self.since - datetime.timedelta(days = 1)
+        return 'UPDATED >= "{}"'.format(since.strftime('%Y/%m/%d %H:%M'))
+
+    def filter(self, issue_list):
+        """Return only the issues updated since the previous export started."""
+        for issue in issue_list:
+            if self.since is not None:
+                issue_updated = datetime.datetime.strptime(raw_issue(issue)['fields']['updated'], output.time_stamp_format)
+                if issue_updated < self.since:
+                    continue
+            yield issue
+
+    def save(self):
+        """Record the start time of this export in the state file."""
+        temporary_path = self.path + '.tmp'
+        with open(temporary_path, 'w') as state:
+            json.dump({ 'started': self.started.strftime(output.time_stamp_format), }, state)
+        os.replace(temporary_path, self.path)
+
+
+class Checkpoint(object):
+    """Progress of an export to an output file, kept in a JSON checkpoint file.
+
+    The checkpoint records each search query, the number of its search
+    results already written and the size of the output file once they were.
+    """
+
+    interval = 10.0 # Seconds between checkpoint file updates.
+
+    def __init__(self, path, query_list):
+        self.path = path
+        self.start_of = collections.OrderedDict((query, 0) for query in query_list)
+        self.offset = None
+        if os.path.exists(path):
+            with open(path) as state:
+                state = json.load(state)
+            if [ query for query, _ in state['queries'] ] != query_list:
+                raise click.UsageError("The CHECKPOINT file records a different export.")
+            self.start_of.update(state['queries'])
+            self.offset = state['offset']
+        self._position_of = dict() # Search result position of each issue not yet written.
+        self._changed = False
+        self._saved = time.time()
+
+    def track(self, query, issue_list):
+        """Return the search results of the query, noting the position of each."""
+        for position, issue in enumerate(issue_list, self.start_of[query]):
+            self._position_of[id(issue)] = (query, position)
+            yield issue
+
+    def written(self, issue, writer):
+        """Note that every row of the issue was written using the writer."""
+        query, position = self._position_of.pop(id(issue))
+        self.start_of[query] = position + 1 # Issues of a query are written in order.
+        self.offset = writer.tell() # Rows of issues not yet noted as written follow the offset.
+        self._changed = True
+        if time.time() - self._saved >= self.interval:
+            self.save()
+
+    def save(self):
+        """Record the progress of the export in the checkpoint file.
+
+        The positions and output file size recorded are those noted when the
+        last issue was written, so rows of a partially written issue are
+        truncated when the export resumes.
+        """
+        if not self._changed:
+            return
+        temporary_path = self.path + '.tmp'
+        with open(temporary_path, 'w') as state:
+            json.dump({ 'queries': list(self.start_of.items()), 'offset': self.offset, }, state)
+        os.replace(temporary_path, self.path)
+        self._saved = time.time()
+
+    def remove(self):
+        """Remove the checkpoint file of a completed export."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
 
 
 class MalformedKey(Exception):
@@ -100,19 +407,108 @@ class MalformedKey(Exception):
     pass
 
 
+def key_clause(key):
+    """Return the JQL clause selecting a project or an issue."""
+    if project_key_regex.match(key):
+        return 'PROJECT = "{}"'.format(key)
+    if issue_key_regex.match(key):
+        return 'ISSUEKEY={}'.format(key)
+    raise MalformedKey("KEY must be a valid project key or issue key.")
+
+
+maximum_key_clause_length = 4000 # URL-encoded characters listing issue keys, keeping search URLs under common 8 KiB limits.
+
+
+def key_clauses(key_list, maximum_length = None):
+    """Return the JQL clauses selecting the projects and issues with the listed keys.
+
+    Each project is selected by its own clause. Issues are selected in
+    batches, each listing as many issue keys as fit in maximum_length
+    URL-encoded characters (by default, maximum_key_clause_length).
+
+    Returns: list of (clause, issue keys) pairs; the issue keys are None for projects
+    """
+    maximum_length = maximum_length or maximum_key_clause_length
+    clause_list = list()
+    batch = list()
+    length = 0
+    for key in key_list:
+        clause = key_clause(key) # Checks the key.
+        if project_key_regex.match(key):
+            clause_list.append((clause, None))
+            continue
+        key_length = len(urllib.parse.quote(key)) + len('%2C')
+        if batch and length + key_length > maximum_length:
+            clause_list.append(('ISSUEKEY IN ({})'.format(','.join(batch)), batch))
+            batch, length = list(), 0
+        batch.append(key)
+        length += key_length
+    if batch:
+        clause_list.append(('ISSUEKEY IN ({})'.format(','.join(batch)), batch))
+    return clause_list
+
+
+def found_keys(issue_list, key_set):
+    """Return the issues, adding the key of each to the set."""
+    for issue in issue_list:
+        key_set.add(raw_issue(issue)['key'])
+        yield issue
+
+
+def read_keys(key_file):
+    """Return the keys listed in a file.
+
+    Keys are separated by white space. Lines starting with # are ignored.
+    """
+    key_list = list()
+    for line in key_file:
+        if not line.lstrip().startswith('#'):
+            key_list.extend(line.split())
+    return key_list
+
+
 @click.command()
-@click.argument('key')
+@click.argument('key', nargs = -1)
+@click.option('--keys-from', help = 'Read keys from the specified file (- for standard input).', type = click.File('r'))
+@click.option('--key-concurrency', help = 'Number of keys searched in parallel.', type = click.IntRange(min = 1), default = 4)
+@click.option('--missing-keys', help = 'Write issue keys that were not found to the specified file.', type = click.File('w'))
 @click.option('--since', help = 'Return issues since the specified time stamp.')
 @click.option('--until', help = 'Return issues until the specified time stamp.')
 @click.option('--worklog/--no-worklog', help = 'Return issue worklogs, if any.', default = False)
+@click.option('--changelog/--no-changelog', help = 'Return issue change histories, if any.', default = False)
 @click.option('--order-by', help = 'Specify how to order search results.')
+@click.option('--concurrency', help = 'Number of search result pages fetched in parallel.', type = click.IntRange(min = 1), default = 1)
+@click.option('--page-size', help = 'Number of issues requested in each search result page.', type = click.IntRange(min = 1))
+@click.option('--adaptive-page-size', help = 'Adjust the page size to the server\'s response times.', is_flag = True, default = False)
+@click.option('--shard-size', help = 'Split searches into creation time windows of at most this many issues.',
+    type = click.IntRange(min = 1))
+@click.option('--incremental', help = 'Return only issues updated since the previous run.', is_flag = True, default = False)
+@click.option('--state', help = 'File recording the most recent update time stamp.', type = click.Path(dir_okay = False))
+@click.option('--format', 'output_format', help = 'Output format.', type = click.Choice(output.format_list), default = 'csv')
+@click.option('--output', 'output_path', help = 'Write the output to the specified file.', type = click.Path(dir_okay = False))
+@click.option('--compression', help = 'Compress the output.', type = click.Choice(output.compression_list))
+@click.option('--fields', help = 'Comma-separated list of issue fields to return.')
+@click.option('--checkpoint', help = 'File recording the progress of the export.', type = click.Path(dir_okay = False))
 @click.pass_context
-def main(ctx, key, since, until, worklog, order_by):
+def main(ctx, key, keys_from, key_concurrency, missing_keys, since, until, worklog, changelog, order_by, concurrency, page_size, adaptive_page_size,
+        shard_size, incremental, state, output_format, output_path, compression, fields, checkpoint):
     """Obtain one or more issues using the provided search criteria.
 
     KEY must be a project key or issue key. If provided only a project key, then
     every issue in the project is returned.
 
+    Provide more than one KEY, or list keys in the KEYS-FROM file, to search
+    them all using one connection to the server. Up to KEY-CONCURRENCY keys are
+    searched in parallel and their issues are merged into one output. Issues
+    of one key keep their order, but issues of different keys are interleaved.
+
+    Issue keys are searched in batches, each listing as many keys as fit in a
+    search request. Batches are searched in parallel like project keys, and
+    the issues of a batch follow the ORDER-BY option rather than the order of
+    the keys. Issue keys that are not found (e.g., deleted, moved, not visible
+    or excluded by other options) are printed to standard error, or written to
+    the MISSING-KEYS file, one per line.
+
     The SINCE and UNTIL times are applied to the issue creation time stamp.
 
     SINCE is interpreted as greater than or equal to and UNTIL as less than or
@@ -140,26 +536,159 @@ def main(ctx, key, since, until, worklog, order_by):
 
     To obtain all ticket information, the issue command must be run with and
     without the WORKLOG option.
+
+    The CHANGELOG option outputs a row for each field changed in each issue
+    change history (e.g., each status transition), containing the field, its
+    values before and after the change, the author and the time of the change.
+    Histories are requested with the search results. Those of issues with more
+    histories than a search result contains are requested separately, for up to
+    CONCURRENCY issues at a time. This option cannot be used with the WORKLOG
+    option.
+
+    The CONCURRENCY option sets the number of search result pages, or issue
+    work logs, requested from the JIRA server at the same time. Issues are
+    always output in the order returned by the server.
+
+    The PAGE-SIZE option sets the number of issues requested in each search
+    result page. The JIRA server may return fewer. The ADAPTIVE-PAGE-SIZE
+    option grows the page size while the server responds quickly and shrinks it
+    when the server is slow or fails.
+
+    The SHARD-SIZE option splits each search into creation time windows of at
+    most SHARD-SIZE issues, avoiding the deep search result pages that large
+    projects need. Up to CONCURRENCY windows are searched in parallel. Issues
+    are ordered by window, then by ORDER-BY within each window.
+
+    The INCREMENTAL option returns only issues created or updated since the
+    previous incremental run using the same STATE file. The STATE file records
+    when the run started. Issues updated while the previous run was in progress
+    are returned again, so use the issue key column to update previously
+    exported rows. Work log output gains a Worklog Id column and
+    contains every work log of each updated issue. Change history output
+    likewise gains a History Id column.
+
+    The FORMAT option selects comma-separated values (csv), one JSON object per
+    line (ndjson) or a Parquet file (parquet). Typed formats contain null in
+    place of N/A and store creation and start times as time stamps. Parquet
+    output requires the pyarrow package and the OUTPUT option, and is written a
+    row group at a time.
+
+    The OUTPUT option writes to a file instead of standard output. The
+    COMPRESSION option compresses the output. If not provided, compression is
+    chosen using the OUTPUT file suffix (.gz, .bz2 or .xz). Parquet files
+    support only gzip compression.
+
+    The FIELDS option replaces the default columns with the listed issue
+    fields (e.g., key,status,assignee,customfield_10010). Only these fields are
+    requested from the server. Follow a field name with a dotted path to select
+    part of its value (e.g., assignee.displayName). Fields containing an object
+    without a well-known value are printed as JSON, and fields the server
+    doesn't return as N/A. This option cannot be used
+    with the WORKLOG or CHANGELOG options.
+
+    The CHECKPOINT option records the progress of the export in a file. If
+    the export is interrupted, run the same command again to append the
+    remaining issues to the OUTPUT file. The CHECKPOINT file is removed once
+    the export completes. It requires the OUTPUT option, an uncompressed csv
+    or ndjson format and cannot be used with the SHARD-SIZE option. Use an
+    ORDER-BY value that keeps issues in the same order between runs (e.g.,
+    key).
     """
+    if incremental and not state:
+        raise click.UsageError("The INCREMENTAL option requires the STATE option.")
+    if fields and (worklog or changelog):
+        raise click.UsageError("The FIELDS option cannot be used with the WORKLOG or CHANGELOG options.")
+    if worklog and changelog:
+        raise click.UsageError("The CHANGELOG option cannot be used with the WORKLOG option.")
+    if 'parquet' == output_format and not output_path:
+        raise click.UsageError("The parquet format requires the OUTPUT option.")
+    if checkpoint and not output_path:
+        raise click.UsageError("The CHECKPOINT option requires the OUTPUT option.")
+    if checkpoint and ('parquet' == output_format or compression or os.path.splitext(output_path)[1] in output.compression_of_suffix):
+        raise click.UsageError("The CHECKPOINT option requires uncompressed csv or ndjson output.")
+    if checkpoint and shard_size:
+        raise click.UsageError("The CHECKPOINT option cannot be used with the SHARD-SIZE option.")
+    output_options = { 'output_format': output_format, 'path': output_path, 'compression': compression, }
+    key_list = list(key) + (read_keys(keys_from) if keys_from else [])
+    if not key_list:
+        raise click.UsageError("Provide at least one KEY.")
+    key_list = list(collections.OrderedDict.fromkeys(key_list)) # Search each key once.
+    key_clause_list = key_clauses(key_list)
     clause = list()
-    project_key = project_key_regex.match(key)
-    if project_key:
-        clause.append('PROJECT = "{}"'.format(project_key.group('project_key')))
-    issue_key = issue_key_regex.match(key)
-    if issue_key:
-        clause.append('ISSUEKEY={}'.format(key))
-    if not (issue_key or project_key):
-        raise MalformedKey("KEY must be a valid project key or issue key.")
     if since:
         clause.append('CREATED >= {}'.format(since))
     if until:
         clause.append('CREATED <= {}'.format(until))
+    column_list = None
+    expand = None
+    if worklog:
+        field_list = worklog_field_list
+    elif changelog:
+        field_list = changelog_field_list
+        expand = 'changelog'
+    elif fields:
+        column_list, field_list = projection_columns([ field.strip() for field in fields.split(',') if field.strip() ])
+        if not column_list:
+            raise click.UsageError("The FIELDS option requires at least one field.")
+        field_list = field_list or [ 'key', ] # Searches without fields return every navigable field.
+    else:
+        field_list = issue_field_list
+    emit_field_list = [] if fields else field_list # Projected fields the server doesn't return are written as missing.
+    if incremental:
+        watermark = Watermark(state)
+        if watermark.clause():
+            clause.append(watermark.clause())
+        field_list = field_list + [ 'updated', ]
     if order_by:
         order_by_clause = ' ORDER BY {}'.format(order_by)
     else:
         order_by_clause = ""
-    result_list = ctx.obj['jira client'].search(' AND '.join(clause) + order_by_clause)
-    if worklog:
-        emit_worklog_fields(ctx, result_list)
+    query_list = [ ' AND '.join([ clause_of_key, ] + clause) + order_by_clause for clause_of_key, _ in key_clause_list ]
+    batch_of = { query: batch for query, (_, batch) in zip(query_list, key_clause_list) if batch }
+    def search(jql_query, startAt = 0):
+        if shard_size and jql_query not in batch_of: # Batches of issue keys are small enough to search at once.
+            return ctx.obj['jira client'].sharded_search(jql_query, fields = field_list, expand = expand,
+                concurrency = concurrency, page_size = page_size, adaptive = adaptive_page_size, raw = True, shard_size = shard_size)
+        return ctx.obj['jira client'].search(jql_query, fields = field_list, expand = expand,
+            concurrency = concurrency, page_size = page_size, adaptive = adaptive_page_size, raw = True, startAt = startAt,
+            validate_query = 'warn' if jql_query in batch_of else True)
+    written = None
+    if checkpoint:
+        checkpoint = Checkpoint(checkpoint, query_list)
+        if checkpoint.offset is not None and not (os.path.exists(output_path) and os.path.getsize(output_path) >= checkpoint.offset):
+            raise click.UsageError("The OUTPUT file is shorter than recorded in the CHECKPOINT file.")
+        output_options['offset'] = checkpoint.offset
+        written = checkpoint.written
+        search_list = [ checkpoint.track(query, search(query, checkpoint.start_of[query])) for query in query_list ]
     else:
-        emit_issue_fields(ctx, result_list)
+        search_list = [ search(query) for query in query_list ]
+    key_set = set()
+    checked_list = [ query for query in query_list if query in batch_of and not (checkpoint and checkpoint.start_of[query]) ]
+    search_list = [ found_keys(result_list, key_set) if query in checked_list else result_list
+        for query, result_list in zip(query_list, search_list) ]
+    result_list = parallel.merge(search_list, key_concurrency)
+    if incremental:
+        result_list = watermark.filter(result_list)
+    try:
+        if worklog:
+            emit_worklog_fields(ctx, result_list, concurrency, worklog_id = incremental, output_options = output_options,
+                written = written)
+        elif changelog:
+            emit_changelog_fields(ctx, result_list, concurrency, history_id = incremental, output_options = output_options,
+                written = written)
+        else:
+            emit_issue_fields(ctx, result_list, output_options = output_options, column_list = column_list,
+                field_list = emit_field_list, written = written)
+    except BaseException:
+        if checkpoint:
+            checkpoint.save()
+        raise
+    if incremental:
+        watermark.save()
+    if checkpoint:
+        checkpoint.remove()
+    missing_key_list = [ key for query in checked_list for key in batch_of[query] if key not in key_set ]
+    if missing_keys:
+        missing_keys.write(''.join(key + '\n' for key in missing_key_list))
+    elif missing_key_list:
+        click.echo("Issue keys not found: {}".format(' '.join(missing_key_list)), err = True)
@@ -0,0 +1,304 @@
+# -*-coding:Utf-8 -*
+
+
+#--------------------------------------------------------------------------------
+# jtlib: mockserver.py
+#
+# Local stand-in for a JIRA server's REST API.
+#--------------------------------------------------------------------------------
+# BSD 2-Clause License
+#
+# Copyright (c) 2018, Brian Minard
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#--------------------------------------------------------------------------------
+
+
+import datetime
+import hashlib
+import http.server
+import json
+import re
+import threading
+import time
+import urllib.parse
+
+
+class MockJiraServer(object):
+    """Serve synthetic JIRA projects from a local HTTP server.
+
+    Each project contains the specified number of issues. Issue number N of a
+    project has N % 4 work logs. Every response is delayed by latency seconds
+    to mimic a remote server. The server runs on a background thread; use it
+    as a context manager or call start() and stop().
+    """
+
+    maximum_results = 1000 # Largest search result page returned.
+    project_search = True # False to mimic servers without paged project searches.
+    changelog_resource = True # False to mimic servers without paged issue changelogs.
+    search_changelog_limit = 2 # Most change histories embedded in a search result.
+    status_list = [ 'Open', 'In Progress', 'In Review', 'Resolved', 'Closed', ]
+    api_path = '/rest/api/2/'
+
+    def __init__(self, projects = None, latency = 0.0):
+        """Create the server.
+
+        Args:
+          projects: dictionary of project key to number of issues
+          latency: seconds to wait before each response
+        """
+        self.projects = projects or { 'MOCK': 100, }
+        self.latency = latency
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """Return the server URL."""
+        return 'http://{}:{}'.format(*self._server.server_address)
+
+    def start(self):
+        self._thread = threading.Thread(target = self._server.serve_forever, daemon = True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                url = urllib.parse.urlsplit(self.path)
+                with server._lock:
+                    server.request_count += 1
+                time.sleep(server.latency)
+                status, body = server.respond(url.path, urllib.parse.parse_qs(url.query))
+                payload = json.dumps(body).encode('utf-8')
+                etag = '"{}"'.format(hashlib.sha1(payload).hexdigest())
+                if 200 == status and etag == self.headers.get('If-None-Match'):
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json;charset=UTF-8')
+                self.send_header('Content-Length', str(len(payload)))
+                if 200 == status:
+                    self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def respond(self, path, query):
+        """Return the HTTP status and JSON body for a request."""
+        if not path.startswith(self.api_path):
+            return 404, { 'errorMessages': [ 'Not found.', ], }
+        resource = path[len(self.api_path):]
+        if 'serverInfo' == resource:
+            return 200, { 'version': '7.1.0', 'versionNumbers': [ 7, 1, 0, ], 'deploymentType': 'Server', }
+        if 'field' == resource:
+            return 200, [ { 'id': name, 'name': name, 'clauseNames': [ name, ], } for name in self.issue(next(iter(self.projects)), 1)['fields'] ]
+        project_list = [ { 'id': str(10000 + index), 'key': key, 'name': 'Project {}'.format(key), }
+            for index, key in enumerate(sorted(self.projects)) ]
+        if 'project' == resource:
+            return 200, project_list
+        if 'project/search' == resource and self.project_search:
+            startAt = int(query.get('startAt', [ 0, ])[0])
+            maxResults = min(int(query.get('maxResults', [ 50, ])[0]), 100)
+            return 200, { 'startAt': startAt, 'maxResults': maxResults, 'total': len(project_list),
+                'isLast': startAt + maxResults >= len(project_list), 'values': project_list[startAt:startAt + maxResults], }
+        if 'search' == resource:
+            return self.search(query)
+        match = re.match(r'^issue/([A-Z][A-Z]+)-(\d+)(/worklog|/changelog)?$', resource)
+        if match and self.exists(match.group(1), int(match.group(2))):
+            if '/worklog' == match.group(3):
+                return 200, self.worklogs(match.group(1), int(match.group(2)), query)
+            if '/changelog' == match.group(3):
+                if not self.changelog_resource:
+                    return 404, { 'errorMessages': [ 'Not Found', ], }
+                return 200, self.changelog(match.group(1), int(match.group(2)), query)
+            field_list = [ field for value in query.get('fields', []) for field in value.split(',') ]
+            return 200, self.issue(match.group(1), int(match.group(2)), field_list, query.get('expand', [ '', ])[0])
+        return 404, { 'errorMessages': [ 'Issue Does Not Exist', ], }
+
+    def exists(self, project, number):
+        return project in self.projects and 1 <= number <= self.projects[project]
+
+    def issue_id(self, project, number):
+        return str(1000000 * (1 + sorted(self.projects).index(project)) + number)
+
+    def raw_worklogs(self, project, number):
+        return [ {
+            'id': '{}{:02}'.format(self.issue_id(project, number), day),
+            'updateAuthor': { 'name': 'user{}'.format(day), },
+            'started': '2018-01-{:02}T09:00:00.000+0000'.format(day),
+            'timeSpent': '{}h'.format(day),
+            'timeSpentSeconds': 3600 * day,
+        } for day in range(1, number % 4 + 1) ]
+
+    def raw_histories(self, project, number):
+        return [ {
+            'id': '{}{:02}'.format(self.issue_id(project, number), index),
+            'author': { 'name': 'user{}'.format(index + 1), },
+            'created': '2018-01-{:02}T{:02}:30:00.000+0000'.format(1 + number % 28, 10 + index),
+            'items': [ {
+                'field': 'status', 'fieldtype': 'jira', 'from': str(index + 1), 'fromString': self.status_list[index],
+                'to': str(index + 2), 'toString': self.status_list[index + 1],
+            }, ] + ([ {
+                'field': 'assignee', 'fieldtype': 'jira', 'from': None, 'fromString': None, 'to': 'user1', 'toString': 'User 1',
+            }, ] if 0 == index else []),
+        } for index in range(number % len(self.status_list)) ]
+
+    def issue(self, project, number, field_list = None, expand = '', changelog_limit = None):
+        """Return the JSON representation of an issue.
+
+        The changelog is included if expanded, with up to changelog_limit histories.
+        """
+        worklogs = self.raw_worklogs(project, number)
+        fields = {
+            'issuetype': { 'name': 'Bug' if number % 3 else 'Task', },
+            'status': { 'name': 'Open' if number % 2 else 'Resolved', },
+            'summary': 'Synthetic issue {} of project {}'.format(number, project),
+            'created': self.created(number),
+            'updated': '2018-02-{:02}T10:00:00.000+0000'.format(1 + number % 28),
+            'timetracking': { 'originalEstimate': '{}h'.format(number % 8), 'remainingEstimate': '1h', } if number % 2 else {},
+            'worklog': { 'startAt': 0, 'maxResults': 20, 'total': len(worklogs), 'worklogs': worklogs[:20], },
+        }
+        if field_list and not ({ '*all', '*navigable', } & set(field_list)):
+            fields = { name: value for name, value in fields.items() if name in field_list }
+        issue = {
+            'id': self.issue_id(project, number),
+            'key': '{}-{}'.format(project, number),
+            'self': '{}{}issue/{}'.format(self.url, self.api_path, self.issue_id(project, number)),
+            'fields': fields,
+        }
+        if 'changelog' in expand.split(','):
+            histories = self.raw_histories(project, number)
+            limit = changelog_limit or len(histories)
+            issue['changelog'] = { 'startAt': 0, 'maxResults': limit, 'total': len(histories), 'histories': histories[:limit], }
+        return issue
+
+    def worklogs(self, project, number, query):
+        worklogs = self.raw_worklogs(project, number)
+        startAt = int(query.get('startAt', [ 0, ])[0])
+        maxResults = min(int(query.get('maxResults', [ 1000, ])[0]), 1000)
+        return { 'startAt': startAt, 'maxResults': maxResults, 'total': len(worklogs),
+            'worklogs': worklogs[startAt:startAt + maxResults], }
+
+    def changelog(self, project, number, query):
+        histories = self.raw_histories(project, number)
+        startAt = int(query.get('startAt', [ 0, ])[0])
+        maxResults = min(int(query.get('maxResults', [ 100, ])[0]), 100)
+        return { 'startAt': startAt, 'maxResults': maxResults, 'total': len(histories),
+            'isLast': startAt + maxResults >= len(histories), 'values': histories[startAt:startAt + maxResults], }
+
+    def created(self, number):
+        """Return the creation time stamp of issue number N of any project."""
+        return '2018-01-{:02}T10:00:00.000+0000'.format(1 + number % 28)
+
+    def matching_issues(self, jql):
+        """Return (project, number) pairs for the issues matching a JQL query.
+
+        Only the clauses used by jtlib are understood: PROJECT, ISSUEKEY, ISSUEKEY IN, ID IN,
+        CREATED comparisons and ORDER BY CREATED. Other clauses are ignored.
+        """
+        jql, order_by = (re.split(r'\s+ORDER\s+BY\s+', jql, maxsplit = 1, flags = re.IGNORECASE) + [ '', ])[:2]
+        issues = self.selected_issues(jql)
+        for operator, time_stamp in re.findall(r'\bCREATED\s*(>=|<)\s*"([^"]*)"', jql, re.IGNORECASE):
+            bound = datetime.datetime.strptime(time_stamp, '%Y/%m/%d %H:%M').strftime('%Y-%m-%dT%H:%M')
+            if '>=' == operator:
+                issues = [ (project, number) for project, number in issues if self.created(number)[:16] >= bound ]
+            else:
+                issues = [ (project, number) for project, number in issues if self.created(number)[:16] < bound ]
+        match = re.match(r'\s*CREATED(\s+(ASC|DESC))?', order_by, re.IGNORECASE)
+        if match:
+            issues.sort(key = lambda issue: self.created(issue[1]), reverse = 'DESC' == (match.group(2) or '').upper())
+        return issues
+
+    def selected_issues(self, jql):
+        """Return (project, number) pairs for the issues selected by a JQL query's PROJECT, ISSUEKEY or ID IN clause."""
+        key_list = self.listed_keys(jql)
+        if key_list is not None:
+            return sorted(set(key for key in key_list if self.exists(*key)))
+        match = re.search(r'\bID\s+IN\s*\(([^)]*)\)', jql, re.IGNORECASE)
+        if match:
+            wanted = set(id.strip() for id in match.group(1).split(','))
+            return [ (project, number) for project in sorted(self.projects) for number in range(1, self.projects[project] + 1)
+                if self.issue_id(project, number) in wanted ]
+        match = re.search(r'\bISSUEKEY\s*=\s*"?([A-Z][A-Z]+)-(\d+)"?', jql, re.IGNORECASE)
+        if match:
+            return [ (match.group(1), int(match.group(2))) ] if self.exists(match.group(1), int(match.group(2))) else []
+        match = re.search(r'\bPROJECT\s*=\s*"?([A-Z][A-Z]+)"?', jql, re.IGNORECASE)
+        if match:
+            project = match.group(1)
+            return [ (project, number) for number in range(1, self.projects.get(project, 0) + 1) ]
+        return [ (project, number) for project in sorted(self.projects) for number in range(1, self.projects[project] + 1) ]
+
+    def listed_keys(self, jql):
+        """Return the (project, number) pairs listed by a JQL query's ISSUEKEY IN clause, or None."""
+        match = re.search(r'\bISSUEKEY\s+IN\s*\(([^)]*)\)', jql, re.IGNORECASE)
+        if not match:
+            return None
+        key_list = [ key.strip().strip('"').split('-') for key in match.group(1).split(',') ]
+        return [ (project, int(number)) for project, number in key_list ]
+
+    def search(self, query):
+        jql = query.get('jql', [ '', ])[0]
+        if 'warn' != query.get('validateQuery', [ 'true', ])[0]:
+            for project, number in self.listed_keys(jql) or []:
+                if not self.exists(project, number):
+                    return 400, { 'errorMessages': [
+                        "An issue with key '{}-{}' does not exist for field 'issuekey'.".format(project, number), ], }
+        match = re.search(r'\bPROJECT\s*=\s*"?([A-Z][A-Z]+)"?', jql, re.IGNORECASE)
+        if match and match.group(1) not in self.projects:
+            return 400, { 'errorMessages': [ "The value '{}' does not exist for the field 'project'.".format(match.group(1)), ], }
+        issues = self.matching_issues(jql)
+        startAt = int(query.get('startAt', [ 0, ])[0])
+        maxResults = min(int(query.get('maxResults', [ 50, ])[0]), self.maximum_results)
+        field_list = [ field for value in query.get('fields', []) for field in value.split(',') ]
+        expand = query.get('expand', [ '', ])[0]
+        return 200, {
+            'startAt': startAt,
+            'maxResults': maxResults,
+            'total': len(issues),
+            'issues': [ self.issue(project, number, field_list, expand, self.search_changelog_limit)
+                for project, number in issues[startAt:startAt + maxResults] ],
+        }
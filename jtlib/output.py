@@ -0,0 +1,263 @@
+# -*-coding:Utf-8 -*
+
+
+#--------------------------------------------------------------------------------
+# jtlib: output.py
+#
+# Issue output formats.
+#--------------------------------------------------------------------------------
+# BSD 2-Clause License
+#
+# Copyright (c) 2018, Brian Minard
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#--------------------------------------------------------------------------------
+
+
+import abc
+import bz2
+import csv
+import datetime
+import gzip
+import io
+import json
+import lzma
+import os
+import sys
+
+
+format_list = [ 'csv', 'ndjson', 'parquet', ]
+compression_list = [ 'gzip', 'bz2', 'xz', ]
+compression_of_suffix = { '.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz', } # Compression used when none is specified.
+compressor_of = {
+    'gzip': lambda stream: gzip.GzipFile(fileobj = stream, mode = 'wb'),
+    'bz2': lambda stream: bz2.BZ2File(stream, mode = 'wb'),
+    'xz': lambda stream: lzma.LZMAFile(stream, mode = 'wb'),
+}
+time_stamp_format = '%Y-%m-%dT%H:%M:%S.%f%z' # Format of time stamps returned by JIRA's REST API.
+
+
+class InvalidOutput(Exception):
+    """Unsupported output format, destination or compression."""
+    pass
+
+
+def encode_value(value):
+    """Return objects and lists as JSON text, leaving other values unchanged."""
+    if value.__class__ is dict or value.__class__ is list:
+        return json.dumps(value, ensure_ascii = False, sort_keys = True)
+    return value
+
+
+class RowWriter(abc.ABC):
+    """Write rows of values to a text stream.
+
+    Columns are (heading, type) pairs. The type is 'string', 'timestamp',
+    'integer' or 'number'. Rows are lists of values in column order, with
+    missing values in place of values that are not available.
+
+    If offset is provided, the uncompressed output file is truncated to offset
+    bytes and rows are appended to it.
+    """
+
+    buffer_size = 1 << 20 # Bytes buffered before writing to a file.
+    missing = None
+
+    def __init__(self, column_list, path = None, compression = None, offset = None):
+        self.column_list = column_list
+        self._close_list = list()
+        self._file = None
+        self._offset = None
+        if path is None and compression is None:
+            self._stream = sys.stdout
+        else:
+            if path is None:
+                sys.stdout.flush()
+                binary = sys.stdout.buffer
+            elif offset is not None:
+                binary = open(path, 'r+b', buffering = self.buffer_size)
+                binary.truncate(offset)
+                binary.seek(offset)
+                self._close_list.append(binary)
+            else:
+                binary = open(path, 'wb', buffering = self.buffer_size)
+                self._close_list.append(binary)
+            if path is not None and compression is None:
+                self._file = binary
+            if compression is not None:
+                binary = compressor_of[compression](binary)
+                self._close_list.append(binary)
+            self._stream = io.TextIOWrapper(binary, encoding = 'utf-8', newline = '')
+
+    @abc.abstractmethod
+    def write(self, row):
+        """Write a row of values."""
+
+    def tell(self):
+        """Return the size of the uncompressed output file, including every row written."""
+        if self._offset is not None: # Closed.
+            return self._offset
+        self._stream.flush()
+        self._file.flush() # Rows are in the file once their size is known.
+        return self._file.tell()
+
+    def close(self):
+        """Flush the rows written and close the output."""
+        self._stream.flush()
+        if self._file is not None:
+            self._offset = self._file.tell()
+        if self._stream is not sys.stdout:
+            self._stream.detach()
+        for stream in reversed(self._close_list): # Compressor first, then the file.
+            stream.close()
+        sys.stdout.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excinfo):
+        self.close()
+
+
+class CsvWriter(RowWriter):
+    """Write comma-separated-value rows, preceded by a row of headings."""
+
+    missing = 'N/A'
+
+    def __init__(self, column_list, path = None, compression = None, offset = None):
+        super(CsvWriter, self).__init__(column_list, path, compression, offset)
+        self._writer = csv.writer(self._stream)
+        if not offset: # Appended rows follow the headings already written.
+            self._writer.writerow([ heading for heading, _ in column_list ])
+
+    def write(self, row):
+        self._writer.writerow([ encode_value(value) for value in row ])
+
+
+class NdjsonWriter(RowWriter):
+    """Write one JSON object per line, keyed by column heading."""
+
+    def __init__(self, column_list, path = None, compression = None, offset = None):
+        super(NdjsonWriter, self).__init__(column_list, path, compression, offset)
+        self._heading_list = [ heading for heading, _ in column_list ]
+        self._encode = json.JSONEncoder(ensure_ascii = False).encode
+
+    def write(self, row):
+        self._stream.write(self._encode(dict(zip(self._heading_list, row))))
+        self._stream.write('\n')
+
+
+def parse_time_stamp(value):
+    """Return the datetime of a JIRA time stamp, or None."""
+    return value and datetime.datetime.strptime(value, time_stamp_format)
+
+
+def encode_string(value):
+    """Return the value as a string, or None."""
+    if value is None or value.__class__ is str:
+        return value
+    return json.dumps(value, ensure_ascii = False, sort_keys = True)
+
+
+class ParquetWriter(object):
+    """Write rows to a Parquet file, row_group_size rows at a time.
+
+    Only one row group is held in memory. Time stamp columns are stored as UTC
+    time stamps. Requires pyarrow.
+    """
+
+    row_group_size = 65536
+    missing = None
+    compression_of = { None: 'snappy', 'gzip': 'gzip', } # Parquet codec of each supported compression.
+
+    def __init__(self, column_list, path, compression = None):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise InvalidOutput("The parquet format requires pyarrow (pip install jtlib[parquet]).")
+        if compression not in self.compression_of:
+            raise InvalidOutput("The parquet format supports only gzip compression.")
+        type_of = { 'string': pyarrow.string(), 'timestamp': pyarrow.timestamp('ms', tz = 'UTC'),
+            'integer': pyarrow.int64(), 'number': pyarrow.float64(), }
+        convert_of = { 'string': encode_string, 'timestamp': parse_time_stamp, }
+        self._pyarrow = pyarrow
+        self._schema = pyarrow.schema([ (heading, type_of[column_type]) for heading, column_type in column_list ])
+        self._convert_list = [ convert_of.get(column_type, lambda value: value) for _, column_type in column_list ]
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema, compression = self.compression_of[compression])
+        self._column_list = [ list() for _ in column_list ]
+        self._row_count = 0
+
+    def write(self, row):
+        for column, value in zip(self._column_list, row):
+            column.append(value)
+        self._row_count += 1
+        if self._row_count >= self.row_group_size:
+            self._write_row_group()
+
+    def _write_row_group(self):
+        array_list = list()
+        for column, convert, field in zip(self._column_list, self._convert_list, self._schema):
+            array_list.append(self._pyarrow.array([ convert(value) for value in column ], type = field.type))
+        self._writer.write_table(self._pyarrow.Table.from_arrays(array_list, schema = self._schema))
+        self._column_list = [ list() for _ in self._column_list ]
+        self._row_count = 0
+
+    def close(self):
+        """Write the remaining rows and the file footer."""
+        if self._row_count:
+            self._write_row_group()
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excinfo):
+        self.close()
+
+
+def open_writer(column_list, output_format = 'csv', path = None, compression = None, offset = None):
+    """Return a row writer for the output format.
+
+    Args:
+      column_list: (heading, type) pair of each column
+      output_format: one of format_list
+      path: output file, or None for standard output
+      compression: one of compression_list, or None to use the compression
+        named by the path suffix (e.g., .gz)
+      offset: size to truncate an existing output file to before appending
+        rows, or None to replace the file
+
+    Returns: writer having write(row) and close() methods
+    """
+    if compression is None and path is not None and 'parquet' != output_format:
+        compression = compression_of_suffix.get(os.path.splitext(path)[1])
+    if offset is not None and (path is None or compression is not None or 'parquet' == output_format):
+        raise InvalidOutput("Only uncompressed csv and ndjson output files can be appended to.")
+    if 'parquet' == output_format:
+        if path is None:
+            raise InvalidOutput("The parquet format requires the OUTPUT option.")
+        return ParquetWriter(column_list, path, compression)
+    if 'ndjson' == output_format:
+        return NdjsonWriter(column_list, path, compression, offset)
+    return CsvWriter(column_list, path, compression, offset)
@@ -0,0 +1,129 @@
+# -*-coding:Utf-8 -*
+
+
+#--------------------------------------------------------------------------------
+# jtlib: parallel.py
+#
+# Bounded concurrency helpers.
+#--------------------------------------------------------------------------------
+# BSD 2-Clause License
+#
+# Copyright (c) 2018, Brian Minard
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#--------------------------------------------------------------------------------
+
+
+import collections
+import concurrent.futures
+import itertools
+import queue
+import threading
+
+
+def ordered_map(function, iterable, concurrency):
+    """Apply a function to each item using a bounded pool of worker threads.
+
+    Args:
+      function: callable applied to each item
+      iterable: items to process
+      concurrency: maximum number of calls in flight at any one time
+
+    Returns: generator yielding results in the order of the items
+    """
+    if concurrency <= 1:
+        for item in iterable:
+            yield function(item)
+        return
+    items = iter(iterable)
+    pending = collections.deque()
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers = concurrency)
+    try:
+        for item in itertools.islice(items, concurrency):
+            pending.append(executor.submit(function, item))
+        while pending:
+            result = pending.popleft().result()
+            for item in itertools.islice(items, 1): # Keep the pool busy while the caller works.
+                pending.append(executor.submit(function, item))
+            yield result
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait = False)
+
+
+def merge(iterable_list, concurrency, buffer_size = 1000):
+    """Consume several iterables using a bounded pool of worker threads.
+
+    Args:
+      iterable_list: iterables to consume
+      concurrency: maximum number of iterables consumed at any one time
+      buffer_size: maximum number of items produced but not yet yielded
+
+    Returns: generator yielding the items of every iterable. Items from one
+    iterable keep their order. Items from different iterables are interleaved
+    in the order they become available.
+    """
+    if concurrency <= 1:
+        for iterable in iterable_list:
+            for item in iterable:
+                yield item
+        return
+    results = queue.Queue(maxsize = buffer_size)
+    stopped = threading.Event()
+
+    def put(entry):
+        while not stopped.is_set():
+            try:
+                results.put(entry, timeout = 0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def consume(iterable):
+        try:
+            for item in iterable:
+                if not put((True, item)):
+                    return
+            put((False, None))
+        except Exception as excinfo:
+            put((False, excinfo))
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers = concurrency)
+    pending = [ executor.submit(consume, iterable) for iterable in iterable_list ]
+    try:
+        remaining = len(pending)
+        while remaining:
+            is_item, value = results.get()
+            if is_item:
+                yield value
+            elif value is None:
+                remaining -= 1
+            else:
+                raise value
+    finally:
+        stopped.set() # Release workers blocked on a full queue.
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait = False)
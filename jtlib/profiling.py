@@ -0,0 +1,103 @@
+# -*-coding:Utf-8 -*
+
+
+#--------------------------------------------------------------------------------
+# jtlib: profiling.py
+#
+# Command profiling.
+#--------------------------------------------------------------------------------
+# BSD 2-Clause License
+#
+# Copyright (c) 2018, Brian Minard
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#--------------------------------------------------------------------------------
+
+
+import cProfile
+import collections
+import os
+import sys
+import threading
+
+
+class Profiler(object):
+    """Profile a command using cProfile, optionally sampling the stacks of every thread.
+
+    cProfile sees only the thread that started it. Searches and work log
+    requests made by worker threads appear there as time spent waiting for
+    them. The stack sampler sees every thread, so use it to attribute that
+    time. Sampled stacks are written in the collapsed format used by flame
+    graph tools: one line per distinct stack, with frames separated by
+    semicolons, followed by the number of samples.
+    """
+
+    interval = 0.005 # Seconds between stack samples.
+
+    def __init__(self, path, stacks_path = None):
+        """Create the profiler.
+
+        Args:
+          path: file receiving the pstats output
+          stacks_path: file receiving the collapsed stacks, or None
+        """
+        self.path = path
+        self.stacks_path = stacks_path
+        self._profile = cProfile.Profile()
+        self._stack_count = collections.Counter()
+        self._stopped = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        """Start profiling the calling thread and sampling every thread."""
+        if self.stacks_path:
+            self._sampler = threading.Thread(target = self._sample, name = 'jt-profiler', daemon = True)
+            self._sampler.start()
+        self._profile.enable()
+
+    def stop(self):
+        """Stop profiling and write the profiles."""
+        self._profile.disable()
+        self._profile.dump_stats(self.path)
+        if self._sampler:
+            self._stopped.set()
+            self._sampler.join()
+            with open(self.stacks_path, 'w') as stacks:
+                for stack, count in sorted(self._stack_count.items()):
+                    stacks.write('{} {}\n'.format(stack, count))
+
+    def _sample(self):
+        name_of = dict()
+        own_id = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            name_of.update((thread.ident, thread.name) for thread in threading.enumerate())
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                frame_list = list()
+                while frame is not None:
+                    code = frame.f_code
+                    frame_list.append('{}:{}'.format(os.path.basename(code.co_filename), code.co_name))
+                    frame = frame.f_back
+                frame_list.append(name_of.get(thread_id, 'thread').replace(' ', '_'))
+                self._stack_count[';'.join(reversed(frame_list))] += 1
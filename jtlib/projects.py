@@ -35,13 +35,35 @@
 
 
 import click
-import jira
+import jtlib.cache
 
 
 @click.command()
+@click.option('--names', help = 'Also list project names, separated from keys by a tab.', is_flag = True, default = False)
+@click.option('--ttl', help = 'Seconds a cached project list is used without contacting the server.',
+   type = click.FloatRange(min = 0), default = 60 * 60, show_default = True)
+@click.option('--refresh', help = 'Obtain the project list from the server, ignoring any cached list.', is_flag = True, default = False)
 @click.pass_context
-def main(ctx):
-   """List all projects keys hosted on the server."""
-   for project in ctx.obj['jira client'].projects():
-       assert isinstance(project, jira.resources.Project)
-       click.echo(project.key)
+def main(ctx, names, ttl, refresh):
+   """List all projects keys hosted on the server.
+
+   Only project keys and names are requested. When jt's CACHE-DIR option is
+   set, the list is kept for TTL seconds, during which the server isn't
+   contacted at all. An expired list is revalidated with the server, which
+   avoids transferring it again if it is unchanged.
+   """
+   url = ctx.obj['jira server url']
+   project_list = None
+   project_cache = jtlib.cache.ProjectCache(ctx.obj['cache dir'], ttl) if ctx.obj.get('cache dir') else None
+   entry = project_cache.get(url) if project_cache and not refresh else None
+   if entry and entry['fresh']:
+       project_list = entry['projects']
+   else:
+       project_list, etag = ctx.obj['connect']().project_list(entry['etag'] if entry else None) # Connect only when needed.
+       if project_list is None:
+           project_list = entry['projects']
+           project_cache.touch(url)
+       elif project_cache:
+           project_cache.put(url, project_list, etag)
+   for project in project_list:
+       click.echo('{}\t{}'.format(project['key'], project['name']) if names else project['key'])
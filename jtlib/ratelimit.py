@@ -0,0 +1,106 @@
+# -*-coding:Utf-8 -*
+
+
+#--------------------------------------------------------------------------------
+# jtlib: ratelimit.py
+#
+# Client-side request rate limiting.
+#--------------------------------------------------------------------------------
+# BSD 2-Clause License
+#
+# Copyright (c) 2018, Brian Minard
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#--------------------------------------------------------------------------------
+
+
+import threading
+import time
+
+
+class TokenBucket(object):
+    """Limit the rate of requests made by any number of threads.
+
+    Tokens accumulate at rate tokens per second, up to burst tokens. Each
+    request takes a token, waiting for one if none is available.
+
+    When the server throttles a request, the rate is halved and no token is
+    issued until the server's retry delay has passed. Each request that
+    succeeds then restores part of the configured rate, so the rate settles
+    just below the server's limit.
+    """
+
+    minimum_rate = 0.1 # Requests per second.
+    recovery = 0.05 # Part of the configured rate restored by each successful request.
+
+    def __init__(self, rate, burst = None):
+        """Create a full bucket.
+
+        Args:
+          rate: requests per second
+          burst: largest number of requests made without waiting; defaults to
+            one second's worth of requests
+        """
+        self.maximum_rate = float(rate)
+        self.rate = self.maximum_rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Take a token, waiting until one is available."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def throttled(self, delay = None):
+        """Slow down after the server throttled a request.
+
+        Args:
+          delay: seconds the server asked to wait, or None
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.minimum_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0) # No bursts until the rate recovers.
+            if delay:
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+    def succeeded(self):
+        """Speed up after a request succeeded, up to the configured rate."""
+        if self.rate < self.maximum_rate:
+            with self._lock:
+                self._refill(time.monotonic())
+                self.rate = min(self.maximum_rate, self.rate + self.recovery * self.maximum_rate)
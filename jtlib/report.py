@@ -0,0 +1,210 @@
+# -*-coding:Utf-8 -*
+
+
+#--------------------------------------------------------------------------------
+# jtlib: report.py
+#
+# Report command interface for JIRA tool group.
+#--------------------------------------------------------------------------------
+# BSD 2-Clause License
+#
+# Copyright (c) 2018, Brian Minard
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#--------------------------------------------------------------------------------
+
+
+import array
+import click
+import collections
+import datetime
+import jtlib.issue as issue
+import jtlib.output as output
+import jtlib.parallel as parallel
+import jtlib.stats
+
+
+group_list = [ 'issue', 'author', 'day', 'week', ] # Ways of grouping work logs.
+heading_of = { 'issue': 'Issue key', 'author': 'Author', 'day': 'Day', 'week': 'Week', }
+
+
+class WorklogTotals(object):
+    """Number of work logs and time spent in each group of work logs.
+
+    Memory grows with the number of groups, not with the number of work logs.
+    Totals are kept in arrays indexed by group. If NumPy is available, the
+    time spent is buffered and added to the totals chunk_size work logs at a
+    time.
+    """
+
+    chunk_size = 65536
+
+    def __init__(self, group_by, use_numpy = True):
+        """Args:
+          group_by: list of group_list entries
+          use_numpy: False to add each work log as it arrives
+        """
+        self.group_by = group_by
+        self._index_of = dict() # Group tuple to index of its totals.
+        self._count = array.array('q')
+        self._seconds = array.array('q')
+        self._week_of = dict() # Day to ISO week.
+        extract_of = {
+            'issue': lambda key, worklog: key,
+            'author': lambda key, worklog: (worklog.get('updateAuthor') or dict()).get('name'),
+            'day': lambda key, worklog: worklog['started'][:10],
+            'week': lambda key, worklog: self.week(worklog['started'][:10]),
+        }
+        self._extract_list = [ extract_of[group] for group in group_by ]
+        self._numpy = None
+        if use_numpy:
+            try:
+                import numpy
+                self._numpy = numpy
+            except ImportError:
+                pass
+        self._chunk_index = array.array('q')
+        self._chunk_seconds = array.array('q')
+
+    def week(self, day):
+        """Return the ISO week (e.g., 2018-W01) containing the day (e.g., 2018-01-01)."""
+        week = self._week_of.get(day)
+        if week is None:
+            year, number, _ = datetime.date(int(day[:4]), int(day[5:7]), int(day[8:10])).isocalendar()
+            week = self._week_of[day] = '{}-W{:02}'.format(year, number)
+        return week
+
+    def add(self, key, worklog):
+        """Add a work log of the issue with the specified key."""
+        group = tuple(extract(key, worklog) for extract in self._extract_list)
+        index = self._index_of.get(group)
+        if index is None:
+            index = self._index_of[group] = len(self._count)
+            self._count.append(0)
+            self._seconds.append(0)
+        seconds = worklog.get('timeSpentSeconds') or 0
+        if self._numpy is None:
+            self._count[index] += 1
+            self._seconds[index] += seconds
+            return
+        self._chunk_index.append(index)
+        self._chunk_seconds.append(seconds)
+        if len(self._chunk_index) >= self.chunk_size:
+            self._flush()
+
+    def _flush(self):
+        """Add the buffered work logs to the totals."""
+        if not self._chunk_index:
+            return
+        numpy = self._numpy
+        index = numpy.frombuffer(self._chunk_index, dtype = numpy.int64)
+        seconds = numpy.frombuffer(self._chunk_seconds, dtype = numpy.int64)
+        group_count = len(self._count)
+        numpy.frombuffer(self._count, dtype = numpy.int64)[:] += numpy.bincount(index, minlength = group_count)
+        total = numpy.zeros(group_count, dtype = numpy.int64)
+        numpy.add.at(total, index, seconds) # Exact, unlike bincount's floating point weights.
+        numpy.frombuffer(self._seconds, dtype = numpy.int64)[:] += total
+        self._chunk_index = array.array('q')
+        self._chunk_seconds = array.array('q')
+
+    def rows(self):
+        """Return the group values, work log count and seconds spent of each group, ordered by group."""
+        self._flush()
+        order = lambda item: tuple('' if value is None else value for value in item[0])
+        for group, index in sorted(self._index_of.items(), key = order):
+            yield list(group) + [ self._count[index], self._seconds[index], ]
+
+
+@click.group()
+def main():
+    """Summarise issue information."""
+    pass
+
+
+@main.command()
+@click.argument('key', nargs = -1)
+@click.option('--keys-from', help = 'Read keys from the specified file (- for standard input).', type = click.File('r'))
+@click.option('--key-concurrency', help = 'Number of keys searched in parallel.', type = click.IntRange(min = 1), default = 4)
+@click.option('--by', 'group_by', help = 'Group work logs by issue, author, day or week. Repeat to combine groups.',
+    type = click.Choice(group_list), multiple = True)
+@click.option('--since', help = 'Include work started on or after the specified day.', type = click.DateTime([ '%Y-%m-%d', ]))
+@click.option('--until', help = 'Include work started on or before the specified day.', type = click.DateTime([ '%Y-%m-%d', ]))
+@click.option('--concurrency', help = 'Number of search result pages, or issue work logs, requested in parallel.',
+    type = click.IntRange(min = 1), default = 1)
+@click.option('--page-size', help = 'Number of issues requested in each search result page.', type = click.IntRange(min = 1))
+@click.option('--numpy/--no-numpy', 'use_numpy', help = 'Add up work logs using NumPy, if installed.', default = True, show_default = True)
+@click.option('--format', 'output_format', help = 'Output format.', type = click.Choice(output.format_list), default = 'csv')
+@click.option('--output', 'output_path', help = 'Write the output to the specified file.', type = click.Path(dir_okay = False))
+@click.option('--compression', help = 'Compress the output.', type = click.Choice(output.compression_list))
+@click.pass_context
+def worklog(ctx, key, keys_from, key_concurrency, group_by, since, until, concurrency, page_size, use_numpy, output_format,
+        output_path, compression):
+    """Total the work logged against issues.
+
+    KEY is a project or issue key, as for the issue command. Each work log is
+    added to the totals of its groups as it is obtained, so that long periods
+    are summarised without keeping every work log. By default, work logs are
+    grouped by issue, author and day. Weeks are ISO weeks (e.g., 2018-W01).
+    Days are those of the work log start times reported by the server.
+
+    Each row contains the group, the number of work logs, and the time spent
+    in seconds and in hours.
+
+    The SINCE and UNTIL options select work started on or between the
+    specified days (e.g., 2018-01-31). The remaining options are those of the
+    issue command.
+    """
+    if 'parquet' == output_format and not output_path:
+        raise click.UsageError("The parquet format requires the OUTPUT option.")
+    key_list = list(key) + (issue.read_keys(keys_from) if keys_from else [])
+    if not key_list:
+        raise click.UsageError("Provide at least one KEY.")
+    group_by = list(collections.OrderedDict.fromkeys(group_by or [ 'issue', 'author', 'day', ]))
+    first_day = since and since.strftime('%Y-%m-%d')
+    last_day = until and until.strftime('%Y-%m-%d')
+    clause = list()
+    if since:
+        clause.append('worklogDate >= "{}"'.format(since.strftime('%Y/%m/%d')))
+    if until:
+        clause.append('worklogDate <= "{}"'.format(until.strftime('%Y/%m/%d')))
+    client = ctx.obj['jira client']
+    search = lambda clause_of_key, batch: client.search(' AND '.join([ clause_of_key, ] + clause), fields = issue.worklog_field_list,
+        concurrency = concurrency, page_size = page_size, raw = True, validate_query = 'warn' if batch else True)
+    key_clause_list = issue.key_clauses(collections.OrderedDict.fromkeys(key_list))
+    issue_list = parallel.merge([ search(clause_of_key, batch) for clause_of_key, batch in key_clause_list ], key_concurrency)
+    stats = ctx.obj.get('stats')
+    totals = WorklogTotals(group_by, use_numpy)
+    add = jtlib.stats.timed(stats, 'extract', totals.add)
+    fetch_worklogs = lambda found: (found['key'], issue.issue_worklogs(ctx, found))
+    for issue_key, worklog_list in jtlib.stats.timed_iterable(stats, 'fetch', parallel.ordered_map(fetch_worklogs, issue_list, concurrency)):
+        for worklog_json in worklog_list:
+            day = worklog_json['started'][:10]
+            if (first_day and day < first_day) or (last_day and day > last_day):
+                continue
+            add(issue_key, worklog_json)
+    column_list = [ (heading_of[group], 'string') for group in group_by ] + [
+        ('Worklogs', 'integer'), ('Time Spent (s)', 'integer'), ('Time Spent (h)', 'number'), ]
+    with output.open_writer(column_list, output_format, output_path, compression) as writer:
+        write = jtlib.stats.timed(stats, 'write', writer.write)
+        for row in totals.rows():
+            write([ writer.missing if value is None else value for value in row ] + [ round(row[-1] / 3600.0, 2), ])
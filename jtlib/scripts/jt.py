@@ -36,30 +36,153 @@
 
 
 import click
+import importlib
 import jtlib
+import jtlib.daemon
+import jtlib.profiling
+import jtlib.stats
+import os
+import sys
+import traceback
 
 
 class CatchExceptions(click.Group):
-    """Global exception handler for group commands."""
+    """Global exception handler for group commands.
+
+    The traceback is also printed when profiling, so that the profile can be
+    related to where the command failed.
+    """
     def __call__(self, *args, **kwargs):
         try:
             return self.main(*args, **kwargs)
         except Exception as excinfo:
+            if (kwargs.get('obj') or dict()).get('profiler'):
+                traceback.print_exc()
             click.echo(str(excinfo))
             click.echo("Usage information available using the --help option.")
 
 
-@click.group(cls = CatchExceptions)
+class LazyGroup(CatchExceptions):
+    """Group command importing its subcommands only when they are used.
+
+    Subcommands are named in lazy_commands, a dictionary of command name to
+    'module:attribute' strings. Subcommands named in lazy_connections call
+    ctx.obj['connect']() to construct the JIRA client only if they need it;
+    other subcommands find it in ctx.obj['jira client'].
+    """
+
+    lazy_commands = {
+        'daemon': 'jtlib.daemon:main',
+        'issue': 'jtlib.issue:main',
+        'report': 'jtlib.report:main',
+        'projects': 'jtlib.projects:main',
+    }
+    lazy_connections = { 'projects', }
+
+    def list_commands(self, ctx):
+        return sorted(set(super(LazyGroup, self).list_commands(ctx)) | set(self.lazy_commands))
+
+    def get_command(self, ctx, name):
+        if name in self.lazy_commands and name not in self.commands:
+            module_name, attribute = self.lazy_commands[name].split(':')
+            self.add_command(getattr(importlib.import_module(module_name), attribute), name = name)
+        return super(LazyGroup, self).get_command(ctx, name)
+
+
+@click.group(cls = LazyGroup)
 @click.argument('jira_server_url')
+@click.option('--cache-dir', help = 'Cache issues and project lists in the specified directory.', envvar = 'JT_CACHE_DIR',
+    type = click.Path(file_okay = False))
+@click.option('--no-cache', help = 'Do not use the issue cache.', is_flag = True, default = False)
+@click.option('--pool-size', help = 'Number of connections kept open to the server.', type = click.IntRange(min = 1))
+@click.option('--timeout', help = 'Seconds to wait for the server to respond.', type = click.FloatRange(min = 0, min_open = True))
+@click.option('--retries', help = 'Number of times a throttled or failed request is retried.', type = click.IntRange(min = 0), default = 3, show_default = True)
+@click.option('--compress/--no-compress', help = 'Request compressed responses.', default = True, show_default = True)
+@click.option('--rate', help = 'Most requests per second made to the server.', type = click.FloatRange(min = 0, min_open = True))
+@click.option('--burst', help = 'Most requests made at once without waiting for the rate.', type = click.IntRange(min = 1))
+@click.option('--stats', help = 'Print request and timing statistics to standard error.', is_flag = True, default = False)
+@click.option('--stats-file', help = 'Write statistics to the specified Prometheus text file.', type = click.Path(dir_okay = False))
+@click.option('--profile', help = 'Write a cProfile (pstats) profile to the specified file.', type = click.Path(dir_okay = False))
+@click.option('--profile-stacks', help = 'Write sampled stacks of every thread, in collapsed format, to the specified file.',
+    type = click.Path(dir_okay = False))
 @click.pass_context
-def jt(ctx, jira_server_url):
-    """JIRA_SERVER_URL must reference a JIRA server."""
-    ctx.obj['jira client'] = jtlib.client.Jira(jira_server_url)
+def jt(ctx, jira_server_url, cache_dir, no_cache, pool_size, timeout, retries, compress, rate, burst, stats, stats_file,
+        profile, profile_stacks):
+    """JIRA_SERVER_URL must reference a JIRA server.
+
+    The CACHE-DIR option enables a local copy of issues and project lists
+    obtained from the server. Cached issues are used only if they have not
+    changed on the server. The JT_CACHE_DIR environment variable also sets
+    this option. The NO-CACHE option disables the cache.
+
+    Requests throttled by the server (HTTP 429), or failing because the server
+    is unavailable or timed out, are retried after a delay. The delay doubles
+    after each attempt unless the server specifies one. Increase POOL-SIZE
+    when using more than 10 concurrent requests.
+
+    The RATE option limits the requests made by all concurrent searches, work
+    log and issue requests. Up to BURST requests (by default, a second's worth)
+    are made without waiting. Throttled requests halve the rate, which then
+    recovers gradually, up to RATE, as requests succeed.
+
+    The STATS option prints a summary of the requests made, their latency,
+    the issues obtained and the time spent obtaining, extracting and writing
+    them. The STATS-FILE option writes the same statistics in the Prometheus
+    text format (e.g., for a node exporter's textfile collector).
 
+    The PROFILE option runs the command under cProfile and writes its pstats
+    output, even if the command fails. Only the main thread is profiled. The
+    PROFILE-STACKS option also samples the stacks of every thread, including
+    those making requests, and writes them in the collapsed format read by
+    flame graph tools. Tracebacks of failed commands are printed when
+    profiling.
 
-jt.add_command(jtlib.projects.main, name = 'projects')
-jt.add_command(jtlib.issue.main, name = 'issue')
+    If the JT_SOCKET environment variable names the socket of a running jt
+    daemon, commands are run by the daemon (see the daemon command).
+    """
+    if profile_stacks and not profile:
+        raise click.UsageError("The PROFILE-STACKS option requires the PROFILE option.")
+    if profile:
+        ctx.obj['profiler'] = jtlib.profiling.Profiler(profile, profile_stacks)
+        ctx.obj['profiler'].start()
+        ctx.call_on_close(ctx.obj['profiler'].stop)
+    if cache_dir and not no_cache:
+        ctx.obj['cache dir'] = cache_dir
+    def connect():
+        cache = jtlib.cache.IssueCache(cache_dir) if ctx.obj.get('cache dir') else None
+        client = jtlib.client.Jira(jira_server_url, cache = cache, pool_size = pool_size,
+            timeout = timeout, max_retries = retries, compress = compress, rate = rate, burst = burst)
+        return client, cache and cache.close
+    ctx.obj['jira server url'] = jira_server_url
+    ctx.obj['connection'] = (jira_server_url, ctx.obj.get('cache dir'), pool_size, timeout, retries, compress, rate, burst)
+    if stats or stats_file:
+        ctx.obj['stats'] = jtlib.stats.Stats()
+        if stats:
+            ctx.call_on_close(lambda: click.echo(ctx.obj['stats'].summary(), err = True))
+        if stats_file:
+            ctx.call_on_close(lambda: ctx.obj['stats'].write_prometheus(stats_file))
+    def client():
+        if 'jira client' in ctx.obj:
+            return ctx.obj['jira client']
+        if 'daemon' in ctx.obj: # Running a command forwarded to jt daemon.
+            ctx.obj['jira client'] = ctx.obj['daemon'].client(ctx.obj['connection'], connect)
+        else:
+            ctx.obj['jira client'], close = connect()
+            if close:
+                ctx.call_on_close(close)
+        if 'stats' in ctx.obj:
+            ctx.obj['jira client'].request_hooks.append(ctx.obj['stats'].record_request)
+            ctx.call_on_close(lambda: ctx.obj['jira client'].request_hooks.remove(ctx.obj['stats'].record_request))
+        return ctx.obj['jira client']
+    ctx.obj['connect'] = client
+    if ctx.invoked_subcommand not in ctx.command.lazy_connections:
+        client()
 
 
 def main():
+    socket_path = os.environ.get('JT_SOCKET')
+    if socket_path:
+        status = jtlib.daemon.forward(socket_path, sys.argv[1:])
+        if status is not None:
+            sys.exit(status)
     return jt(obj = {})
@@ -36,9 +36,11 @@
 
 from click.testing import CliRunner
 import click
+import os
 import pkg_resources
 import pytest
 import subprocess
+import sys
 import jtlib
 
 
@@ -100,3 +102,66 @@ def test_main_with_invalid_url_argument(runner, context, server_url):
     result = runner.invoke(jtlib.scripts.jt, [ server_url ], obj = context)
     assert 2 == result.exit_code
     assert 'Usage:' in result.output
+
+
+def imported_modules(*args):
+    """Return the modules imported by a Python interpreter, with their cumulative import times.
+
+    Args:
+        args: command-line arguments for the interpreter
+
+    Returns:
+        dictionary of module name to microseconds.
+    """
+    environment = dict(os.environ, PYTHONPATH = os.path.dirname(os.path.dirname(jtlib.__file__)))
+    process = subprocess.run([ sys.executable, '-X', 'importtime', ] + list(args), env = environment,
+        stdout = subprocess.PIPE, stderr = subprocess.PIPE, universal_newlines = True)
+    modules = dict()
+    for line in process.stderr.splitlines():
+        if line.startswith('import time:'):
+            _, cumulative, name = line[len('import time:'):].split('|')
+            if cumulative.strip().isdigit(): # Skip the heading.
+                modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def test_script_help_startup():
+    """Check that the help option doesn't import the JIRA library or its dependencies."""
+    modules = imported_modules('-c', 'import jtlib.scripts; jtlib.scripts.main()', '--help')
+    assert 'jtlib.scripts' in modules
+    assert 'jira' not in modules
+    assert 'requests' not in modules
+    assert modules['jtlib.scripts'] < 500000, "jt takes too long to start."
+
+
+def test_package_unknown_attribute():
+    """Check that unknown package attributes don't import every submodule."""
+    modules = imported_modules('-c', 'import jtlib; hasattr(jtlib, "nothing")')
+    assert 'jtlib' in modules
+    assert 'jira' not in modules
+
+
+def test_package_exports():
+    """Check that the package exports the client and command names."""
+    namespace = dict()
+    exec('from jtlib import *', namespace)
+    assert jtlib.client.Jira is namespace['Jira']
+    assert jtlib.scripts.jt is namespace['jt']
+    assert set(jtlib.__all__) <= set(namespace)
+
+
+def test_stats_options(runner, mock_server, tmpdir):
+    """Check that statistics are printed and written to a Prometheus text file."""
+    path = str(tmpdir.join('jt.prom'))
+    result = runner.invoke(jtlib.scripts.jt, [ '--stats', '--stats-file', path, mock_server.url, 'issue', 'SMALL', ], obj = dict())
+    assert 0 == result.exit_code
+    assert 'requests: 1 (search 1), retries 0, errors 0' in result.output
+    assert 'jt_issues_total 3' in open(path).read().splitlines()
+
+
+def test_profile_option_survives_errors(runner, mock_server, tmpdir):
+    """Check that the profile is written when the command fails."""
+    path = str(tmpdir.join('profile'))
+    result = runner.invoke(jtlib.scripts.jt, [ '--profile', path, mock_server.url, 'issue', 'NOPE', ], obj = dict())
+    assert isinstance(result.exception, jtlib.client.JiraServerError)
+    assert os.path.getsize(path)
@@ -0,0 +1,195 @@
+# -*-coding:Utf-8 -*
+
+
+#--------------------------------------------------------------------------------
+# jtlib: stats.py
+#
+# Request and processing statistics.
+#--------------------------------------------------------------------------------
+# BSD 2-Clause License
+#
+# Copyright (c) 2018, Brian Minard
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#--------------------------------------------------------------------------------
+
+
+import collections
+import os
+import threading
+import time
+
+
+quantile_list = [ 0.5, 0.95, 0.99, ]
+
+
+def percentile(sorted_list, quantile):
+    """Return the nearest-rank quantile of a sorted list, or 0.0 if it is empty."""
+    if not sorted_list:
+        return 0.0
+    return sorted_list[min(len(sorted_list) - 1, max(0, int(round(quantile * len(sorted_list))) - 1))]
+
+
+class Stats(object):
+    """Statistics of the requests made to a JIRA server and of the time spent in each phase of a command.
+
+    Use record_request() as a Jira request hook. Phases are timed using
+    timed() and timed_iterable(). Every method may be called from any thread.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.issue_count = 0
+        self._latency_of = collections.defaultdict(list) # Request kind to latencies.
+        self._status_count = collections.Counter() # (request kind, HTTP status) to request count.
+        self._retry_count = collections.Counter() # Request kind to retry count.
+        self._bytes_of = collections.Counter() # Request kind to response bytes.
+        self._seconds_of = collections.Counter() # Phase to seconds.
+        self._lock = threading.Lock()
+
+    def record_request(self, kind, latency, response_bytes, status, retries):
+        """Record a request.
+
+        Args:
+          kind: kind of request (e.g., search)
+          latency: seconds taken by the last attempt
+          response_bytes: size of every response received
+          status: HTTP status of the last attempt, or 0 if no response was received
+          retries: number of failed attempts
+        """
+        with self._lock:
+            self._latency_of[kind].append(latency)
+            self._status_count[(kind, status)] += 1
+            self._retry_count[kind] += retries
+            self._bytes_of[kind] += response_bytes
+
+    def add_time(self, phase, seconds):
+        with self._lock:
+            self._seconds_of[phase] += seconds
+
+    def add_issues(self, count):
+        with self._lock:
+            self.issue_count += count
+
+    def summary(self):
+        """Return a human readable summary."""
+        with self._lock:
+            elapsed = time.time() - self.started
+            latency_list = sorted(latency for latency_list in self._latency_of.values() for latency in latency_list)
+            request_count = len(latency_list)
+            kind_count = ', '.join('{} {}'.format(kind, len(latencies)) for kind, latencies in sorted(self._latency_of.items()))
+            error_count = sum(count for (_, status), count in self._status_count.items() if not 200 <= status < 300)
+            response_bytes = sum(self._bytes_of.values())
+            line_list = [
+                'requests: {}{}, retries {}, errors {}'.format(request_count, ' ({})'.format(kind_count) if kind_count else '',
+                    sum(self._retry_count.values()), error_count),
+                'latency: ' + ', '.join('p{:g} {:.3f} s'.format(100 * quantile, percentile(latency_list, quantile))
+                    for quantile in quantile_list),
+                'issues: {} in {:.1f} s ({:.1f} issues/s), {:.0f} bytes/issue'.format(self.issue_count, elapsed,
+                    self.issue_count / elapsed if elapsed else 0.0, response_bytes / self.issue_count if self.issue_count else 0.0),
+            ]
+            if self._seconds_of:
+                line_list.append('phases: ' + ', '.join('{} {:.3f} s'.format(phase, seconds)
+                    for phase, seconds in sorted(self._seconds_of.items())))
+        return '\n'.join(line_list)
+
+    def prometheus(self):
+        """Return the statistics in the Prometheus text exposition format."""
+        line_list = list()
+        def metric(name, metric_type, help_text, sample_list):
+            line_list.append('# HELP jt_{} {}'.format(name, help_text))
+            line_list.append('# TYPE jt_{} {}'.format(name, metric_type))
+            for suffix, label_list, value in sample_list:
+                labels = ','.join('{}="{}"'.format(label, value) for label, value in label_list)
+                line_list.append('jt_{}{}{} {:g}'.format(name, suffix, '{' + labels + '}' if labels else '', value))
+        with self._lock:
+            metric('requests_total', 'counter', 'Requests made to the JIRA server.',
+                [ ('', [ ('kind', kind), ('status', status), ], count) for (kind, status), count in sorted(self._status_count.items()) ])
+            metric('request_retries_total', 'counter', 'Failed request attempts that were retried.',
+                [ ('', [ ('kind', kind), ], count) for kind, count in sorted(self._retry_count.items()) ])
+            sample_list = list()
+            for kind, latencies in sorted(self._latency_of.items()):
+                latencies = sorted(latencies)
+                sample_list.extend(('', [ ('kind', kind), ('quantile', '{:g}'.format(quantile)), ], percentile(latencies, quantile))
+                    for quantile in quantile_list)
+                sample_list.append(('_sum', [ ('kind', kind), ], sum(latencies)))
+                sample_list.append(('_count', [ ('kind', kind), ], len(latencies)))
+            metric('request_duration_seconds', 'summary', 'Request latency.', sample_list)
+            metric('response_bytes_total', 'counter', 'Size of the responses received.',
+                [ ('', [ ('kind', kind), ], count) for kind, count in sorted(self._bytes_of.items()) ])
+            metric('issues_total', 'counter', 'Issues processed.', [ ('', [], self.issue_count), ])
+            metric('phase_seconds_total', 'counter', 'Time spent in each phase.',
+                [ ('', [ ('phase', phase), ], seconds) for phase, seconds in sorted(self._seconds_of.items()) ])
+            metric('run_duration_seconds', 'gauge', 'Duration of the run.', [ ('', [], time.time() - self.started), ])
+        return '\n'.join(line_list) + '\n'
+
+    def write_prometheus(self, path):
+        """Write the statistics to a Prometheus textfile collector file.
+
+        The file is replaced atomically so the collector never reads a partial file.
+        """
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'w') as textfile:
+            textfile.write(self.prometheus())
+        os.replace(temporary_path, path)
+
+
+def timed(stats, phase, function):
+    """Return the function, adding the time spent in each call to the phase's time.
+
+    Returns the function unchanged if stats is None.
+    """
+    if stats is None:
+        return function
+    clock = time.perf_counter
+    def timed_function(*args, **kwargs):
+        started = clock()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            stats.add_time(phase, clock() - started)
+    return timed_function
+
+
+def timed_iterable(stats, phase, iterable):
+    """Return the items of the iterable, adding the time spent waiting for each to the phase's time.
+
+    Each item is counted as an issue. Returns the iterable unchanged if stats
+    is None.
+    """
+    if stats is None:
+        return iterable
+    clock = time.perf_counter
+    def timed_items():
+        items = iter(iterable)
+        while True:
+            started = clock()
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            finally:
+                stats.add_time(phase, clock() - started)
+            stats.add_issues(1)
+            yield item
+    return timed_items()
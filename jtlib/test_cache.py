@@ -0,0 +1,113 @@
+# -*-coding:Utf-8 -*
+
+
+#--------------------------------------------------------------------------------
+# jtlib: test_cache.py
+#
+# Test cases for the cache module.
+#--------------------------------------------------------------------------------
+# BSD 2-Clause License
+#
+# Copyright (c) 2018, Brian Minard
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#--------------------------------------------------------------------------------
+
+
+import jtlib.cache as cache
+import pytest
+import time
+
+
+@pytest.fixture
+def issue_cache(tmpdir):
+    """Return an empty issue cache."""
+    return cache.IssueCache(str(tmpdir))
+
+
+def raw_issue(key, updated):
+    return { 'key': key, 'fields': { 'updated': updated, 'summary': key, }, }
+
+
+def test_cache_get_unchanged_issue(issue_cache):
+    """Check that an unchanged issue is returned."""
+    issue_cache.put(raw_issue('FAKE-1', '2018-01-01'))
+    assert raw_issue('FAKE-1', '2018-01-01') == issue_cache.get('FAKE-1', '2018-01-01')
+
+
+def test_cache_get_changed_issue(issue_cache):
+    """Check that a changed issue is not returned."""
+    issue_cache.put(raw_issue('FAKE-1', '2018-01-01'))
+    assert issue_cache.get('FAKE-1', '2018-01-02') is None
+    assert issue_cache.get('FAKE-1', '2018-01-01', 'changelog') is None
+
+
+def test_cache_many_issues_in_one_transaction(issue_cache):
+    """Check that issues are stored and obtained in batches, one transaction per batch."""
+    statement_list = list()
+    issue_cache._connection.set_trace_callback(statement_list.append)
+    issue_cache.put_many([ raw_issue('FAKE-{}'.format(number), '2018-01-01') for number in range(1, 4) ])
+    assert [ raw_issue('FAKE-1', '2018-01-01'), None, raw_issue('FAKE-3', '2018-01-01'), None, ] == issue_cache.get_many([
+        ('FAKE-1', '2018-01-01'), ('FAKE-2', '2018-01-02'), ('FAKE-3', '2018-01-01'), ('FAKE-4', '2018-01-01'), ])
+    assert 2 == statement_list.count('COMMIT')
+
+
+def test_cache_persists(tmpdir):
+    """Check that issues are available after the cache is reopened."""
+    issue_cache = cache.IssueCache(str(tmpdir))
+    issue_cache.put(raw_issue('FAKE-1', '2018-01-01'))
+    issue_cache.close()
+    assert cache.IssueCache(str(tmpdir)).get('FAKE-1', '2018-01-01')
+
+
+def test_cache_evicts_least_recently_used(tmpdir):
+    """Check that the cache size is bounded."""
+    issue_cache = cache.IssueCache(str(tmpdir), max_entries = 2)
+    for number in range(1, 4):
+        issue_cache.put(raw_issue('FAKE-{}'.format(number), '2018-01-01'))
+        time.sleep(0.01)
+    issue_cache.get('FAKE-1', '2018-01-01')
+    issue_cache.evict()
+    assert issue_cache.get('FAKE-1', '2018-01-01')
+    assert issue_cache.get('FAKE-2', '2018-01-01') is None
+    assert issue_cache.get('FAKE-3', '2018-01-01')
+
+
+def test_cache_evicts_old_issues(tmpdir):
+    """Check that unused issues expire."""
+    issue_cache = cache.IssueCache(str(tmpdir), max_age = 0)
+    issue_cache.put(raw_issue('FAKE-1', '2018-01-01'))
+    time.sleep(0.01)
+    issue_cache.evict()
+    assert issue_cache.get('FAKE-1', '2018-01-01') is None
+
+
+def test_project_cache(tmpdir):
+    """Check that project lists are kept per server and expire."""
+    project_cache = cache.ProjectCache(str(tmpdir))
+    assert project_cache.get('https://jira.example.com') is None
+    project_cache.put('https://jira.example.com', [ { 'key': 'FAKE', 'name': 'Fake', }, ], '"1"')
+    entry = cache.ProjectCache(str(tmpdir)).get('https://jira.example.com/')
+    assert entry['fresh'] and '"1"' == entry['etag'] and 'FAKE' == entry['projects'][0]['key']
+    assert cache.ProjectCache(str(tmpdir)).get('https://other.example.com') is None
+    assert not cache.ProjectCache(str(tmpdir), ttl = 0).get('https://jira.example.com')['fresh']
@@ -34,7 +34,11 @@
 #--------------------------------------------------------------------------------
 
 
+import asyncio
+import jtlib.cache as cache
 import jtlib.client as client
+import jtlib.mockserver
+import jtlib.ratelimit as ratelimit
 import pytest
 import re
 
@@ -109,3 +113,284 @@ def test_client_search_method(the_client):
             break
         page_count += 1
     assert page_count > 0, "JIRA project has too few issues to test search algorithm."
+
+
+#
+# Handle search pagination without a JIRA server.
+#
+
+
+concurrency_list = [ 1, 2, 8, ]
+
+
+@pytest.mark.parametrize("concurrency", concurrency_list)
+def test_search_order(fake_client, concurrency):
+    """Check that concurrent page fetches return every issue in server order."""
+    keys = [ issue.key for issue in fake_client.search('PROJECT = FAKE', concurrency = concurrency) ]
+    assert [ 'FAKE-{}'.format(number) for number in range(1, 138) ] == keys
+
+
+def test_search_page_requests(fake_client):
+    """Check that each page is requested exactly once."""
+    list(fake_client.search('PROJECT = FAKE', concurrency = 4))
+    assert [ 0, 50, 100, ] == sorted(startAt for startAt, _ in fake_client._JIRA.search_calls)
+
+
+def test_search_raw(fake_client):
+    """Check that raw searches return the JSON representation of each issue."""
+    issue_list = list(fake_client.search('PROJECT = FAKE', concurrency = 2, raw = True))
+    assert all(isinstance(issue, dict) for issue in issue_list)
+    assert [ 'FAKE-{}'.format(number) for number in range(1, 138) ] == [ issue['key'] for issue in issue_list ]
+
+
+def test_worklogs_method_pages(fake_client):
+    """Check that every work log is returned when more than a page exists."""
+    fake_client.maximum_worklog_results = 2
+    worklogs = list(fake_client.worklogs('FAKE-3'))
+    assert [ '1h', '2h', '3h', ] == [ worklog.timeSpent for worklog in worklogs ]
+    assert [ 'FAKE-3', 'FAKE-3', ] == fake_client._JIRA.worklog_calls
+
+
+def test_search_with_cache(fake_client, tmpdir):
+    """Check that only changed issues are obtained in full after the first search."""
+    fake_client._cache = cache.IssueCache(str(tmpdir))
+    first = [ issue.raw for issue in fake_client.search('PROJECT = FAKE', concurrency = 2) ]
+    fake_client._JIRA.updated[42] = '2018-03-01T10:00:00.000+0000'
+    fake_client._JIRA.search_queries = list()
+    second = [ issue.raw for issue in fake_client.search('PROJECT = FAKE', concurrency = 2) ]
+    assert 137 == len(second)
+    assert first[:41] == second[:41]
+    assert '2018-03-01T10:00:00.000+0000' == second[41]['fields']['updated']
+    assert [ 'ID IN (10042)', ] == [ query for query in fake_client._JIRA.search_queries if query.startswith('ID IN') ]
+
+
+@pytest.mark.parametrize("page_size", [ 1, 50, ])
+def test_project_list(mock_server, page_size):
+    """Check that project keys and names are listed, one page at a time if necessary."""
+    the_client = client.Jira(mock_server.url)
+    the_client.maximum_project_results = page_size
+    project_list, etag = the_client.project_list()
+    assert [ { 'key': 'MOCK', 'name': 'Project MOCK', }, { 'key': 'SMALL', 'name': 'Project SMALL', }, ] == project_list
+    assert (etag is None) == (1 == page_size)
+    if etag:
+        assert (None, etag) == the_client.project_list(etag)
+
+
+def test_project_list_without_project_search(mock_server, monkeypatch):
+    """Check that servers without project searches are listed in a single request."""
+    monkeypatch.setattr(mock_server, 'project_search', False)
+    the_client = client.Jira(mock_server.url)
+    project_list, etag = the_client.project_list()
+    assert [ 'MOCK', 'SMALL', ] == [ project['key'] for project in project_list ]
+    assert (None, etag) == the_client.project_list(etag)
+    assert [ 'MOCK', 'SMALL', ] == [ project['key'] for project in the_client.project_list('"stale"')[0] ]
+
+
+@pytest.mark.parametrize("changelog_resource", [ True, False, ])
+def test_changelog_method(mock_server, monkeypatch, changelog_resource):
+    """Check that every change history is returned, a page at a time where possible."""
+    monkeypatch.setattr(mock_server, 'changelog_resource', changelog_resource)
+    the_client = client.Jira(mock_server.url)
+    the_client.maximum_changelog_results = 3
+    history_list = list(the_client.changelog('MOCK-4'))
+    assert [ 'Open', 'In Progress', 'In Review', 'Resolved', ] == [ history['items'][0]['fromString'] for history in history_list ]
+    with pytest.raises(client.JiraServerError):
+        list(the_client.changelog('MOCK-1000'))
+
+
+class CappedMockJiraServer(jtlib.mockserver.MockJiraServer):
+    """Server returning at most 100 issues per page when every field is requested."""
+
+    def search(self, query):
+        field_list = [ field for value in query.get('fields', [ '*all', ]) for field in value.split(',') ]
+        self.expand_list.append(query.get('expand', [ '', ])[0])
+        if '*all' in field_list:
+            query = dict(query, maxResults = [ str(min(int(query.get('maxResults', [ 50, ])[0]), 100)), ])
+        return super(CappedMockJiraServer, self).search(query)
+
+
+def test_search_with_cache_and_smaller_full_pages(tmpdir):
+    """Check that cached searches return every issue when full issue pages are smaller, without expanding the first search."""
+    with CappedMockJiraServer({ 'MOCK': 600, }) as server:
+        server.expand_list = list()
+        the_client = client.Jira(server.url, cache = cache.IssueCache(str(tmpdir)))
+        issue_list = list(the_client.search('PROJECT = MOCK', expand = 'changelog', page_size = 500, raw = True))
+        assert [ 'MOCK-{}'.format(number) for number in range(1, 601) ] == [ issue['key'] for issue in issue_list ]
+        assert all('changelog' in issue for issue in issue_list)
+        assert [ '', ] + [ 'changelog', ] * 5 + [ '', 'changelog', ] == server.expand_list # Time stamps, then full pages.
+
+
+@pytest.mark.parametrize("concurrency", [ 1, 4, ])
+def test_sharded_search(mock_server, concurrency):
+    """Check that sharded searches return every issue once, in creation order."""
+    the_client = client.Jira(mock_server.url)
+    issue_list = list(the_client.sharded_search('PROJECT = MOCK ORDER BY CREATED ASC', fields = [ 'created', ],
+        concurrency = concurrency, shard_size = 10, raw = True))
+    assert sorted('MOCK-{}'.format(number) for number in range(1, 121)) == sorted(issue['key'] for issue in issue_list)
+    created_list = [ issue['fields']['created'] for issue in issue_list ]
+    assert sorted(created_list) == created_list
+
+
+def test_sharded_search_without_issues(mock_server):
+    the_client = client.Jira(mock_server.url)
+    assert [] == list(the_client.sharded_search('PROJECT = MOCK AND CREATED >= "2019/01/01 00:00"', shard_size = 10))
+
+
+#
+# Handle search page sizes.
+#
+
+
+def search_keys(the_client, **kwargs):
+    return [ issue.key for issue in the_client.search('PROJECT = FAKE', **kwargs) ]
+
+
+expected_keys = [ 'FAKE-{}'.format(number) for number in range(1, 138) ]
+
+
+@pytest.mark.parametrize("concurrency", [ 1, 4, ])
+def test_search_respects_server_page_limit(fake_client, concurrency):
+    """Check that no issues are skipped when the server returns smaller pages than requested."""
+    fake_client._JIRA.server_maximum = 30
+    assert expected_keys == search_keys(fake_client, page_size = 100, concurrency = concurrency)
+    assert 30 == max(maxResults for _, maxResults in fake_client._JIRA.search_calls[1:])
+
+
+def test_search_adaptive_page_size_grows(fake_client):
+    """Check that an adaptive page size grows when the server responds quickly."""
+    assert expected_keys == search_keys(fake_client, page_size = 10, adaptive = True)
+    assert [ 0, 10, 30, 70, ] == [ startAt for startAt, _ in fake_client._JIRA.search_calls ]
+
+
+def test_search_adaptive_page_size_shrinks(fake_client):
+    """Check that an adaptive page size shrinks when the server fails."""
+    fake_client._JIRA.failure_maximum = 40
+    assert expected_keys == search_keys(fake_client, page_size = 100, adaptive = True, concurrency = 2)
+
+
+def test_search_adaptive_page_size_remembers_failures(fake_client):
+    """Check that a failed page size is neither retried nor grown back to."""
+    fake_client._JIRA.failure_maximum = 40
+    assert expected_keys == search_keys(fake_client, page_size = 100, adaptive = True)
+    assert [ 100, 50, ] == [ maxResults for _, maxResults in fake_client._JIRA.search_calls if maxResults > 40 ]
+
+
+def test_search_fixed_page_size_fails(fake_client):
+    """Check that server failures are reported when the page size is fixed."""
+    fake_client._JIRA.failure_maximum = 40
+    with pytest.raises(client.JiraServerError) as excinfo:
+        search_keys(fake_client, page_size = 100)
+    assert 503 == excinfo.value.status_code
+
+
+#
+# Handle the asyncio client.
+#
+
+
+def run(coroutine):
+    return asyncio.get_event_loop_policy().new_event_loop().run_until_complete(coroutine)
+
+
+def test_async_client_with_invalid_url_argument(mock_server):
+    """Check async client when the server URL isn't a JIRA server."""
+    with pytest.raises(client.InvalidUrl):
+        run(client.AsyncJira.create(mock_server.url + '/nothing'))
+
+
+def test_async_client_projects_method(mock_server):
+    async def projects():
+        async with await client.AsyncJira.create(mock_server.url) as the_client:
+            return [ project.key for project in await the_client.projects() ]
+    assert [ 'MOCK', 'SMALL', ] == run(projects())
+
+
+def test_async_client_issue_method(mock_server):
+    async def issue():
+        async with await client.AsyncJira.create(mock_server.url) as the_client:
+            return await the_client.issue('MOCK-7')
+    assert 'Synthetic issue 7 of project MOCK' == run(issue()).fields.summary
+
+
+@pytest.mark.parametrize("concurrency", [ 1, 4, ])
+def test_async_client_search_method(mock_server, concurrency):
+    """Check that every issue is returned in server order."""
+    async def search():
+        async with await client.AsyncJira.create(mock_server.url, concurrency = concurrency) as the_client:
+            return [ issue.key async for issue in the_client.search('PROJECT = MOCK', fields = [ 'summary', ], page_size = 25) ]
+    assert [ 'MOCK-{}'.format(number) for number in range(1, 121) ] == run(search())
+
+
+def test_async_client_search_method_invalid_query(mock_server):
+    """Check that server errors are reported using the synchronous client's exceptions."""
+    async def search():
+        async with await client.AsyncJira.create(mock_server.url) as the_client:
+            return [ issue async for issue in the_client.search('PROJECT = NOPE') ]
+    with pytest.raises(client.JiraServerError):
+        run(search())
+
+
+#
+# Handle retries.
+#
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record the delays requested by the client instead of sleeping."""
+    delays = list()
+    monkeypatch.setattr(client.time, 'sleep', delays.append)
+    return delays
+
+
+def test_search_retries_failed_page(fake_client, sleeps):
+    """Check that a transient failure is retried for the failed page alone."""
+    fake_client._JIRA.failures[100] = [ (503, None), (429, '7'), ]
+    assert expected_keys == search_keys(fake_client, concurrency = 2)
+    assert [ 0, 50, 100, 100, 100, ] == sorted(startAt for startAt, _ in fake_client._JIRA.search_calls)
+    assert 7.0 == sleeps[-1]
+
+
+def test_search_throttling_lowers_rate(fake_client, sleeps):
+    """Check that the rate limit drops when the server throttles a request, then recovers."""
+    fake_client._limiter = ratelimit.TokenBucket(1000)
+    fake_client._JIRA.failures[100] = [ (429, '0'), ]
+    assert expected_keys == search_keys(fake_client)
+    assert 500.0 < fake_client._limiter.rate < 1000.0
+
+
+def test_request_hooks(fake_client, sleeps):
+    """Check that each request is reported once, with its retries."""
+    request_list = list()
+    fake_client.request_hooks.append(lambda kind, latency, response_bytes, status, retries:
+        request_list.append((kind, status, retries)))
+    fake_client._JIRA.failures[50] = [ (503, None), ]
+    assert expected_keys == search_keys(fake_client)
+    list(fake_client.worklogs('FAKE-3'))
+    assert [ ('search', 200, 0), ('search', 200, 1), ('search', 200, 0), ('worklog', 200, 0), ] == request_list
+
+
+def test_search_retry_backoff(fake_client, sleeps):
+    """Check that retry delays grow exponentially."""
+    fake_client.backoff = 1.0
+    fake_client._JIRA.failures[50] = [ (503, None), ] * 3
+    search_keys(fake_client)
+    assert 3 == len(sleeps)
+    for attempt, delay in enumerate(sleeps):
+        assert 0.5 * 2 ** attempt <= delay <= 1.5 * 2 ** attempt
+
+
+def test_search_retries_exhausted(fake_client, sleeps):
+    """Check that a failure persisting after every retry is reported."""
+    fake_client._JIRA.failures[50] = [ (503, None), ] * 4
+    with pytest.raises(client.JiraServerError):
+        search_keys(fake_client)
+    assert 3 == len(sleeps)
+
+
+def test_search_does_not_retry_client_errors(fake_client, sleeps):
+    """Check that failures other than throttling and server unavailability are not retried."""
+    fake_client._JIRA.failures[0] = [ (400, None), ]
+    with pytest.raises(client.JiraServerError):
+        search_keys(fake_client)
+    assert [] == sleeps
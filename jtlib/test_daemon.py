@@ -0,0 +1,117 @@
+# -*-coding:Utf-8 -*
+
+
+#--------------------------------------------------------------------------------
+# jtlib: test_daemon.py
+#
+# Test cases for the daemon module.
+#--------------------------------------------------------------------------------
+# BSD 2-Clause License
+#
+# Copyright (c) 2018, Brian Minard
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#--------------------------------------------------------------------------------
+
+
+import click
+import jtlib
+import jtlib.daemon as daemon
+import pytest
+import threading
+
+
+@pytest.fixture
+def jt_daemon(tmpdir):
+    """Return a daemon serving commands on a background thread."""
+    the_daemon = daemon.Daemon(str(tmpdir.join('jt.sock')), jtlib.scripts.jt)
+    thread = threading.Thread(target = the_daemon.serve)
+    thread.start()
+    yield the_daemon
+    the_daemon.stop()
+    thread.join()
+    the_daemon.close()
+
+
+def test_forward_reuses_client(jt_daemon, mock_server, capsys):
+    """Check that forwarded commands print their output and share a client."""
+    assert 0 == daemon.forward(jt_daemon.path, [ mock_server.url, 'projects', ])
+    assert 0 == daemon.forward(jt_daemon.path, [ '--stats', mock_server.url, 'issue', 'SMALL', ])
+    captured = capsys.readouterr()
+    assert captured.out.startswith('MOCK\nSMALL\nIssue key,')
+    assert 3 + 3 == len(captured.out.splitlines())
+    assert captured.err.startswith('requests: 1 (search 1),') # Only the search; the client is already connected.
+    assert 1 == len(jt_daemon._client_of)
+    client = next(iter(jt_daemon._client_of.values()))
+    assert [] == client.request_hooks
+
+
+def test_forward_exit_status(jt_daemon, mock_server, capsys):
+    assert 2 == daemon.forward(jt_daemon.path, [ mock_server.url, 'issue', ])
+    assert 'Provide at least one KEY.' in capsys.readouterr().err
+
+
+def test_forward_runs_in_working_directory(jt_daemon, mock_server, tmpdir):
+    with tmpdir.as_cwd():
+        assert 0 == daemon.forward(jt_daemon.path, [ mock_server.url, 'issue', 'SMALL', '--output', 'small.csv', ])
+    assert 4 == len(tmpdir.join('small.csv').readlines())
+
+
+def test_forward_without_daemon(tmpdir):
+    assert daemon.forward(str(tmpdir.join('jt.sock')), [ 'http://localhost', 'projects', ]) is None
+
+
+def test_forward_standard_input_locally(jt_daemon):
+    assert daemon.forward(jt_daemon.path, [ 'http://localhost', 'issue', '--keys-from', '-', ]) is None
+    assert daemon.forward(jt_daemon.path, [ 'http://localhost', 'issue', '--keys-from=-', ]) is None
+
+
+def test_forward_while_busy_runs_locally(tmpdir):
+    """Check that a command forwarded while another runs isn't held up by it."""
+    started, finish = threading.Event(), threading.Event()
+    @click.command()
+    @click.argument('name')
+    def blocking(name):
+        started.set()
+        finish.wait()
+    the_daemon = daemon.Daemon(str(tmpdir.join('jt.sock')), blocking)
+    thread = threading.Thread(target = the_daemon.serve)
+    thread.start()
+    status_list = list()
+    forwarding = threading.Thread(target = lambda: status_list.append(daemon.forward(the_daemon.path, [ 'slow', ])))
+    forwarding.start()
+    try:
+        assert started.wait(5)
+        assert daemon.forward(the_daemon.path, [ 'quick', ]) is None
+    finally:
+        finish.set()
+        forwarding.join()
+        the_daemon.stop()
+        thread.join()
+        the_daemon.close()
+    assert [ 0, ] == status_list
+
+
+def test_daemon_already_running(jt_daemon):
+    with pytest.raises(click.UsageError):
+        daemon.Daemon(jt_daemon.path, jtlib.scripts.jt)
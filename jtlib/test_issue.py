@@ -38,6 +38,7 @@ from click.testing import CliRunner
 import click
 import jtlib.issue as issue
 import jtlib
+import json
 import pytest
 
 
@@ -253,3 +254,336 @@ def test_order_by(runner, context):
     for a in range(1, len(ascending)):
         assert ascending[a] == descending[d]
         d -= 1
+
+
+#
+# Handle issue fields obtained from the search results.
+#
+
+
+def test_issue_fields_from_search(runner, fake_client):
+    """Check that issues are not requested again when the search contains every field."""
+    result = runner.invoke(issue.main, [ 'FAKE', ], obj = { 'jira client': fake_client, })
+    assert 0 == result.exit_code
+    assert 'FAKE-1,Bug,Open,Issue 1,2018-01-02T15:48:51.377+0000,1h,N/A' in result.output
+    assert 'FAKE-2,Bug,Open,Issue 2,2018-01-02T15:48:51.377+0000,N/A,N/A' in result.output
+    assert 138 == len(result.output.splitlines())
+    assert [] == fake_client._JIRA.issue_calls
+
+
+def test_issue_fields_missing_from_search(runner, fake_client):
+    """Check that only issues missing a field are requested again."""
+    fake_client._JIRA.search_omits = ( 3, 99, )
+    result = runner.invoke(issue.main, [ 'FAKE', ], obj = { 'jira client': fake_client, })
+    assert 0 == result.exit_code
+    assert 'FAKE-3,Bug,Open,Issue 3,2018-01-02T15:48:51.377+0000,3h,N/A' in result.output
+    assert [ 'FAKE-3', 'FAKE-99', ] == fake_client._JIRA.issue_calls
+
+
+@pytest.mark.parametrize("raw", [ True, False, ])
+def test_emit_issue_fields_accepts_resources_and_raw_issues(capsys, fake_client, raw):
+    """Check that issues are printed the same way whether or not they are issue resources."""
+    ctx = click.Context(issue.main, obj = { 'jira client': fake_client, })
+    issue.emit_issue_fields(ctx, fake_client.search('PROJECT = FAKE', raw = raw))
+    lines = capsys.readouterr().out.splitlines()
+    assert 138 == len(lines)
+    assert 'FAKE-1,Bug,Open,Issue 1,2018-01-02T15:48:51.377+0000,1h,N/A' == lines[1]
+
+
+def test_issue_fields_ndjson_output(runner, fake_client, tmpdir):
+    """Check that typed output formats contain null in place of N/A."""
+    path = str(tmpdir.join('issues.ndjson'))
+    result = runner.invoke(issue.main, [ 'FAKE', '--format', 'ndjson', '--output', path, ], obj = { 'jira client': fake_client, })
+    assert 0 == result.exit_code
+    assert '' == result.output
+    with open(path) as ndjson_file:
+        issue_list = [ json.loads(line) for line in ndjson_file ]
+    assert 137 == len(issue_list)
+    assert { 'Issue key': 'FAKE-2', 'Issue Type': 'Bug', 'Status': 'Open', 'Summary': 'Issue 2',
+        'Created': '2018-01-02T15:48:51.377+0000', 'Original Estimate': None, 'Remaining Estimate': None, } == issue_list[1]
+
+
+def test_parquet_output_requires_output_option(runner, fake_client):
+    result = runner.invoke(issue.main, [ 'FAKE', '--format', 'parquet', ], obj = { 'jira client': fake_client, })
+    assert 2 == result.exit_code
+
+
+#
+# Handle field projections.
+#
+
+
+def test_fields_projection(runner, fake_client):
+    """Check that only the projected fields are requested and printed."""
+    result = runner.invoke(issue.main, [ 'FAKE', '--fields', 'key,status,assignee,assignee.displayName,customfield_10010', ],
+        obj = { 'jira client': fake_client, })
+    assert 0 == result.exit_code
+    lines = result.output.splitlines()
+    assert 'key,status,assignee,assignee.displayName,customfield_10010' == lines[0]
+    assert 'FAKE-1,Open,user1,User 1,"{""id"": ""1"", ""value"": ""Team 1""}"' == lines[1]
+    assert 'FAKE-2,Open,N/A,N/A,"{""id"": ""2"", ""value"": ""Team 2""}"' == lines[2]
+    assert all([ 'status', 'assignee', 'customfield_10010', ] == fields for fields in fake_client._JIRA.search_fields)
+    assert [] == fake_client._JIRA.issue_calls
+
+
+def test_fields_projection_ndjson(runner, fake_client, tmpdir):
+    """Check that typed output formats keep object values as JSON objects."""
+    path = str(tmpdir.join('issues.ndjson'))
+    result = runner.invoke(issue.main, [ 'FAKE-1', '--fields', 'key,customfield_10010', '--format', 'ndjson', '--output', path, ],
+        obj = { 'jira client': fake_client, })
+    assert 0 == result.exit_code
+    with open(path) as ndjson_file:
+        assert { 'key': 'FAKE-1', 'customfield_10010': { 'id': '1', 'value': 'Team 1', }, } == json.loads(ndjson_file.readline())
+
+
+def test_fields_projection_unknown_field(runner, fake_client):
+    """Check that fields the server doesn't return are missing values, without requesting each issue."""
+    result = runner.invoke(issue.main, [ 'FAKE', '--fields', 'key,statsu', ], obj = { 'jira client': fake_client, })
+    assert 0 == result.exit_code
+    assert 'FAKE-1,N/A' == result.output.splitlines()[1]
+    assert [] == fake_client._JIRA.issue_calls
+
+
+def test_fields_projection_without_fields(runner, fake_client):
+    """Check that projections of issue attributes alone request a single field."""
+    result = runner.invoke(issue.main, [ 'FAKE', '--fields', 'key,id', ], obj = { 'jira client': fake_client, })
+    assert 0 == result.exit_code
+    assert 'FAKE-1,10001' == result.output.splitlines()[1]
+    assert all([ 'key', ] == fields for fields in fake_client._JIRA.search_fields)
+
+
+def test_fields_projection_with_worklog(runner, fake_client):
+    result = runner.invoke(issue.main, [ 'FAKE', '--worklog', '--fields', 'key', ], obj = { 'jira client': fake_client, })
+    assert 2 == result.exit_code
+
+
+#
+# Handle many keys.
+#
+
+
+def test_many_keys(runner, mock_server, tmpdir):
+    """Check that the issues of every key are returned once, in order for each key."""
+    key_file = tmpdir.join('keys')
+    key_file.write('# Projects\nSMALL\n\nMOCK SMALL\n')
+    result = runner.invoke(jtlib.scripts.jt, [ mock_server.url, 'issue', 'SMALL', '--keys-from', str(key_file),
+        '--key-concurrency', '2', '--page-size', '25', ], obj = dict())
+    assert 0 == result.exit_code
+    key_list = [ line.split(',')[0] for line in result.output.splitlines()[1:] ]
+    assert [ 'SMALL-1', 'SMALL-2', 'SMALL-3', ] == [ key for key in key_list if key.startswith('SMALL') ]
+    assert [ 'MOCK-{}'.format(number) for number in range(1, 121) ] == [ key for key in key_list if key.startswith('MOCK') ]
+    assert 123 == len(key_list)
+
+
+def test_many_keys_sharded(runner, mock_server):
+    """Check that sharded searches of many keys return every issue once."""
+    result = runner.invoke(jtlib.scripts.jt, [ mock_server.url, 'issue', 'MOCK', 'SMALL', '--shard-size', '20',
+        '--concurrency', '2', ], obj = dict())
+    assert 0 == result.exit_code
+    key_list = [ line.split(',')[0] for line in result.output.splitlines()[1:] ]
+    assert 123 == len(set(key_list)) == len(key_list)
+
+
+def test_key_clauses():
+    """Check that issue keys are batched, and that project keys are searched separately."""
+    assert [
+        ('PROJECT = "PROJ"', None),
+        ('ISSUEKEY IN (AB-1,BC-22)', [ 'AB-1', 'BC-22', ]),
+        ('ISSUEKEY IN (CD-333)', [ 'CD-333', ]),
+    ] == issue.key_clauses([ 'AB-1', 'PROJ', 'BC-22', 'CD-333', ], maximum_length = 16)
+    with pytest.raises(issue.MalformedKey):
+        issue.key_clauses([ 'AB-1', 'ab-2', ])
+
+
+def test_batched_keys(runner, mock_server, monkeypatch, tmpdir):
+    """Check that batches of issue keys return every issue found and report the others."""
+    monkeypatch.setattr(issue, 'maximum_key_clause_length', 100)
+    key_list = [ 'MOCK-{}'.format(number) for number in range(1, 130, 2) ] + [ 'SMALL-3', 'NOPE-1', ]
+    key_file = tmpdir.join('keys')
+    key_file.write('\n'.join(key_list))
+    missing_file = tmpdir.join('missing')
+    result = runner.invoke(jtlib.scripts.jt, [ mock_server.url, 'issue', '--keys-from', str(key_file),
+        '--missing-keys', str(missing_file), ], obj = dict())
+    assert 0 == result.exit_code
+    found_list = [ line.split(',')[0] for line in result.output.splitlines()[1:] ]
+    assert sorted(key_list[:60] + [ 'SMALL-3', ]) == sorted(found_list)
+    assert key_list[60:65] + [ 'NOPE-1', ] == missing_file.read().split()
+
+
+def test_batched_keys_reported(runner, mock_server):
+    result = runner.invoke(jtlib.scripts.jt, [ mock_server.url, 'issue', 'SMALL-1', 'SMALL-9', '--worklog', ], obj = dict())
+    assert 0 == result.exit_code
+    assert 'Issue keys not found: SMALL-9' in result.output
+
+
+def test_keys_from_standard_input(runner, mock_server):
+    result = runner.invoke(jtlib.scripts.jt, [ mock_server.url, 'issue', '--keys-from', '-', ], input = 'SMALL\n', obj = dict())
+    assert 0 == result.exit_code
+    assert 4 == len(result.output.splitlines())
+
+
+def test_missing_key(runner, fake_client):
+    result = runner.invoke(issue.main, [], obj = { 'jira client': fake_client, })
+    assert 2 == result.exit_code
+
+
+#
+# Handle checkpoints.
+#
+
+
+@pytest.mark.parametrize("option_list", [ [], [ '--worklog', ], [ '--format', 'ndjson', ], ])
+def test_checkpoint_resumes_export(runner, fake_client, tmpdir, option_list):
+    """Check that an interrupted export resumes where it stopped, appending to the output."""
+    expected_path = str(tmpdir.join('expected'))
+    result = runner.invoke(issue.main, [ 'FAKE', '--output', expected_path, ] + option_list, obj = { 'jira client': fake_client, })
+    assert 0 == result.exit_code
+    path, checkpoint_path = str(tmpdir.join('output')), str(tmpdir.join('checkpoint'))
+    option_list = option_list + [ '--output', path, '--checkpoint', checkpoint_path, ]
+    fake_client._JIRA.failures[100] = [ (400, None), ]
+    result = runner.invoke(issue.main, [ 'FAKE', ] + option_list, obj = { 'jira client': fake_client, })
+    assert isinstance(result.exception, jtlib.client.JiraServerError)
+    with open(checkpoint_path) as checkpoint_file:
+        assert [ [ 'PROJECT = "FAKE"', 100, ], ] == json.load(checkpoint_file)['queries']
+    fake_client._JIRA.search_calls = list()
+    result = runner.invoke(issue.main, [ 'FAKE', ] + option_list, obj = { 'jira client': fake_client, })
+    assert 0 == result.exit_code
+    assert [ (100, 50), ] == fake_client._JIRA.search_calls
+    assert open(expected_path, 'rb').read() == open(path, 'rb').read()
+    assert not tmpdir.join('checkpoint').exists()
+
+
+def test_checkpoint_resumes_partially_written_issue(runner, fake_client, tmpdir, monkeypatch):
+    """Check that rows of an issue interrupted while being written are written once on resume."""
+    expected_path = str(tmpdir.join('expected'))
+    result = runner.invoke(issue.main, [ 'FAKE', '--worklog', '--output', expected_path, ], obj = { 'jira client': fake_client, })
+    assert 0 == result.exit_code
+    write = jtlib.output.CsvWriter.write
+    def interrupted_write(self, row):
+        if [ 'FAKE-7', 'user2', ] == row[:2]: # The second of its three work logs.
+            raise KeyboardInterrupt()
+        write(self, row)
+    monkeypatch.setattr(jtlib.output.CsvWriter, 'write', interrupted_write)
+    path, checkpoint_path = str(tmpdir.join('output')), str(tmpdir.join('checkpoint'))
+    option_list = [ 'FAKE', '--worklog', '--output', path, '--checkpoint', checkpoint_path, ]
+    result = runner.invoke(issue.main, option_list, obj = { 'jira client': fake_client, })
+    assert 1 == result.exit_code # Aborted.
+    with open(checkpoint_path) as checkpoint_file:
+        assert [ [ 'PROJECT = "FAKE"', 6, ], ] == json.load(checkpoint_file)['queries']
+    monkeypatch.setattr(jtlib.output.CsvWriter, 'write', write)
+    result = runner.invoke(issue.main, option_list, obj = { 'jira client': fake_client, })
+    assert 0 == result.exit_code
+    assert open(expected_path, 'rb').read() == open(path, 'rb').read()
+
+
+def test_checkpoint_requires_uncompressed_output(runner, fake_client, tmpdir):
+    result = runner.invoke(issue.main, [ 'FAKE', '--output', str(tmpdir.join('output.csv.gz')), '--checkpoint',
+        str(tmpdir.join('checkpoint')), ], obj = { 'jira client': fake_client, })
+    assert 2 == result.exit_code
+
+
+#
+# Handle work logs obtained from the search results.
+#
+
+
+@pytest.mark.parametrize("concurrency", [ '1', '4', ])
+def test_worklog_fields_from_search(runner, fake_client, concurrency):
+    """Check that work logs are requested only for issues with incomplete search results."""
+    result = runner.invoke(issue.main, [ 'FAKE', '--worklog', '--concurrency', concurrency, ], obj = { 'jira client': fake_client, })
+    assert 0 == result.exit_code
+    lines = result.output.splitlines()
+    assert 'Issue key,Author,Started,Time Spent' == lines[0]
+    assert [ 'FAKE-3,user1,2018-01-01T09:00:00.000+0000,1h',
+        'FAKE-3,user2,2018-01-02T09:00:00.000+0000,2h',
+        'FAKE-3,user3,2018-01-03T09:00:00.000+0000,3h',
+    ] == lines[4:7]
+    assert set('FAKE-{}'.format(number) for number in range(3, 138, 4)) == set(fake_client._JIRA.worklog_calls)
+    assert 34 == len(fake_client._JIRA.worklog_calls)
+    assert [] == fake_client._JIRA.issue_calls
+
+
+#
+# Handle change histories.
+#
+
+
+@pytest.mark.parametrize("concurrency", [ '1', '4', ])
+def test_changelog_fields(runner, mock_server, concurrency):
+    """Check that changelogs are requested only for issues with incomplete search results."""
+    the_client = jtlib.client.Jira(mock_server.url)
+    kind_list = list()
+    the_client.request_hooks.append(lambda kind, *args: kind_list.append(kind))
+    result = runner.invoke(issue.main, [ 'SMALL', '--changelog', '--concurrency', concurrency, ], obj = { 'jira client': the_client, })
+    assert 0 == result.exit_code
+    assert [
+        'Issue key,Field,From,To,Author,Changed',
+        'SMALL-1,status,Open,In Progress,user1,2018-01-02T10:30:00.000+0000',
+        'SMALL-1,assignee,N/A,User 1,user1,2018-01-02T10:30:00.000+0000',
+        'SMALL-2,status,Open,In Progress,user1,2018-01-03T10:30:00.000+0000',
+        'SMALL-2,assignee,N/A,User 1,user1,2018-01-03T10:30:00.000+0000',
+        'SMALL-2,status,In Progress,In Review,user2,2018-01-03T11:30:00.000+0000',
+        'SMALL-3,status,Open,In Progress,user1,2018-01-04T10:30:00.000+0000',
+        'SMALL-3,assignee,N/A,User 1,user1,2018-01-04T10:30:00.000+0000',
+        'SMALL-3,status,In Progress,In Review,user2,2018-01-04T11:30:00.000+0000',
+        'SMALL-3,status,In Review,Resolved,user3,2018-01-04T12:30:00.000+0000',
+    ] == result.output.splitlines()
+    assert [ 'search', 'changelog', ] == kind_list
+
+
+def test_changelog_with_worklog(runner, fake_client):
+    result = runner.invoke(issue.main, [ 'FAKE', '--worklog', '--changelog', ], obj = { 'jira client': fake_client, })
+    assert 2 == result.exit_code
+
+
+#
+# Handle incremental option.
+#
+
+
+def test_incremental_requires_state(runner, fake_client):
+    """Check that incremental exports require a state file."""
+    result = runner.invoke(issue.main, [ 'FAKE', '--incremental', ], obj = { 'jira client': fake_client, })
+    assert 2 == result.exit_code
+
+
+def test_incremental_returns_updated_issues(runner, fake_client, tmpdir):
+    """Check that only issues updated since the previous run are returned."""
+    state = str(tmpdir.join('state.json'))
+    arguments = [ 'FAKE', '--incremental', '--state', state, ]
+    first = runner.invoke(issue.main, arguments, obj = { 'jira client': fake_client, })
+    assert 0 == first.exit_code
+    assert 138 == len(first.output.splitlines())
+    assert 'started' in json.loads(tmpdir.join('state.json').read())
+    tmpdir.join('state.json').write(json.dumps({ 'started': '2018-02-01T10:30:00.000+0000', }))
+    fake_client._JIRA.updated[5] = '2018-02-01T10:25:00.000+0000' # Updated while the previous run was in progress.
+    fake_client._JIRA.updated[7] = '2018-02-01T11:00:00.000+0000'
+    second = runner.invoke(issue.main, arguments, obj = { 'jira client': fake_client, })
+    assert 0 == second.exit_code
+    assert 'PROJECT = "FAKE" AND UPDATED >= "2018/01/31 10:20"' == fake_client._JIRA.search_queries[-1]
+    assert [ 'FAKE-5', 'FAKE-7', ] == [ line.split(',')[0] for line in second.output.splitlines()[1:] ]
+    tmpdir.join('state.json').write(json.dumps({ 'started': '2018-02-01T12:00:00.000+0000', }))
+    third = runner.invoke(issue.main, arguments + [ '--worklog', ], obj = { 'jira client': fake_client, })
+    assert 'Issue key,Author,Started,Time Spent,Worklog Id' == third.output.splitlines()[0]
+    assert 1 == len(third.output.splitlines())
+
+
+#
+# Handle compiled rows.
+#
+
+
+row_list = [
+    ({ 'key': 'A-1', 'fields': { 'status': { 'name': 'Open', }, 'summary': 'S', }, }, [ 'A-1', 'Open', 'S', 'N/A', ]),
+    ({ 'key': 'A-1', 'fields': { 'status': None, 'summary': None, }, }, [ 'A-1', 'N/A', 'N/A', 'N/A', ]),
+    ({ 'key': 'A-1', 'fields': { 'status': 'Open', 'timetracking': {}, }, }, [ 'A-1', 'N/A', 'N/A', 'N/A', ]),
+    ({ 'fields': [], }, [ 'N/A', 'N/A', 'N/A', 'N/A', ]),
+    ({}, [ 'N/A', 'N/A', 'N/A', 'N/A', ]),
+]
+
+
+@pytest.mark.parametrize("raw, expected", row_list)
+def test_compile_row(raw, expected):
+    """Check that values are extracted, and missing values are identified, by compiled rows."""
+    row = issue.compile_row([ 'key', 'fields.status.name', 'fields.summary', 'fields.timetracking.originalEstimate', ])
+    assert expected == row(raw)
@@ -0,0 +1,101 @@
+# -*-coding:Utf-8 -*
+
+
+#--------------------------------------------------------------------------------
+# jtlib: test_output.py
+#
+# Unit tests for output.py.
+#--------------------------------------------------------------------------------
+# BSD 2-Clause License
+#
+# Copyright (c) 2018, Brian Minard
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#--------------------------------------------------------------------------------
+
+
+import gzip
+import json
+import jtlib.output as output
+import pytest
+
+
+column_list = [ ('Issue key', 'string'), ('Created', 'timestamp'), ]
+row_list = [
+    [ 'FAKE-1', '2018-01-02T15:48:51.377+0000', ],
+    [ 'FAKE-2', None, ],
+]
+
+
+def test_row_writer_is_abstract():
+    with pytest.raises(TypeError):
+        output.RowWriter(column_list)
+
+
+def test_csv_writer_file(tmpdir):
+    """Check that CSV files start with a row of headings."""
+    path = str(tmpdir.join('issues.csv'))
+    with output.open_writer(column_list, 'csv', path) as writer:
+        for row in row_list:
+            writer.write(row)
+    with open(path, newline = '') as csv_file:
+        assert 'Issue key,Created\r\nFAKE-1,2018-01-02T15:48:51.377+0000\r\nFAKE-2,\r\n' == csv_file.read()
+
+
+def test_ndjson_writer_compression_from_suffix(tmpdir):
+    """Check that a .gz output file is gzip compressed."""
+    path = str(tmpdir.join('issues.ndjson.gz'))
+    with output.open_writer(column_list, 'ndjson', path) as writer:
+        for row in row_list:
+            writer.write(row)
+    with gzip.open(path, 'rt') as ndjson_file:
+        assert [ dict(zip([ 'Issue key', 'Created', ], row)) for row in row_list ] == [ json.loads(line) for line in ndjson_file ]
+
+
+def test_ndjson_writer_standard_output(capsys):
+    """Check that uncompressed output is written to standard output by default."""
+    with output.open_writer(column_list, 'ndjson') as writer:
+        writer.write(row_list[1])
+    assert '{"Issue key": "FAKE-2", "Created": null}\n' == capsys.readouterr().out
+
+
+def test_parquet_writer_requires_path():
+    """Check that Parquet output is never written to standard output."""
+    with pytest.raises(output.InvalidOutput):
+        output.open_writer(column_list, 'parquet')
+
+
+def test_parquet_writer_row_groups(tmpdir, monkeypatch):
+    """Check that Parquet files are written a row group at a time, with typed columns."""
+    pyarrow_parquet = pytest.importorskip('pyarrow.parquet')
+    monkeypatch.setattr(output.ParquetWriter, 'row_group_size', 2)
+    path = str(tmpdir.join('issues.parquet'))
+    with output.open_writer(column_list, 'parquet', path) as writer:
+        for row in row_list + row_list[:1]:
+            writer.write(row)
+    parquet_file = pyarrow_parquet.ParquetFile(path)
+    assert 2 == parquet_file.num_row_groups
+    table = parquet_file.read()
+    assert 'timestamp[ms, tz=UTC]' == str(table.schema.field('Created').type)
+    assert [ 'FAKE-1', 'FAKE-2', 'FAKE-1', ] == table.column('Issue key').to_pylist()
+    assert table.column('Created').to_pylist()[1] is None
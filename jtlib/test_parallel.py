@@ -0,0 +1,105 @@
+# -*-coding:Utf-8 -*
+
+
+#--------------------------------------------------------------------------------
+# jtlib: test_parallel.py
+#
+# Test cases for the parallel module.
+#--------------------------------------------------------------------------------
+# BSD 2-Clause License
+#
+# Copyright (c) 2018, Brian Minard
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#--------------------------------------------------------------------------------
+
+
+import jtlib.parallel as parallel
+import pytest
+import random
+import time
+
+
+def slow_square(value):
+    """Square a value after a short, random delay."""
+    time.sleep(random.uniform(0.0, 0.01))
+    return value * value
+
+
+@pytest.mark.parametrize("concurrency", [ 1, 3, 16, ])
+def test_ordered_map_preserves_order(concurrency):
+    """Check that results are returned in input order."""
+    assert [ value * value for value in range(40) ] == list(parallel.ordered_map(slow_square, range(40), concurrency))
+
+
+def test_ordered_map_propagates_exceptions():
+    """Check that a worker exception is raised to the caller."""
+    def fail(value):
+        if 3 == value:
+            raise ValueError(value)
+        return value
+    with pytest.raises(ValueError):
+        list(parallel.ordered_map(fail, range(10), 4))
+
+
+def slow_range(start, stop):
+    """Return a range of values, each after a short, random delay."""
+    for value in range(start, stop):
+        time.sleep(random.uniform(0.0, 0.002))
+        yield value
+
+
+@pytest.mark.parametrize("concurrency", [ 1, 3, 16, ])
+def test_merge_returns_every_item(concurrency):
+    """Check that every item is returned, keeping the order of each iterable."""
+    result = list(parallel.merge([ slow_range(start, start + 10) for start in range(0, 100, 10) ], concurrency, buffer_size = 4))
+    assert list(range(100)) == sorted(result)
+    for start in range(0, 100, 10):
+        assert list(range(start, start + 10)) == [ value for value in result if start <= value < start + 10 ]
+
+
+def test_merge_propagates_exceptions():
+    """Check that an exception raised by an iterable is raised to the caller."""
+    def fail():
+        yield 1
+        raise ValueError()
+    with pytest.raises(ValueError):
+        list(parallel.merge([ slow_range(0, 10), fail(), slow_range(10, 20), ], 2))
+
+
+def test_merge_stops_workers_when_closed():
+    """Check that workers stop when the caller stops consuming items."""
+    consumed = list()
+    def endless():
+        value = 0
+        while True:
+            consumed.append(value)
+            yield value
+            value += 1
+    merged = parallel.merge([ endless(), endless(), ], 2, buffer_size = 2)
+    next(merged)
+    merged.close()
+    time.sleep(0.3)
+    count = len(consumed)
+    time.sleep(0.2)
+    assert count == len(consumed)
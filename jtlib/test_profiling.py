@@ -0,0 +1,60 @@
+# -*-coding:Utf-8 -*
+
+
+#--------------------------------------------------------------------------------
+# jtlib: test_profiling.py
+#
+# Unit tests for profiling.py.
+#--------------------------------------------------------------------------------
+# BSD 2-Clause License
+#
+# Copyright (c) 2018, Brian Minard
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#--------------------------------------------------------------------------------
+
+
+import jtlib.parallel as parallel
+import jtlib.profiling as profiling
+import pstats
+import time
+
+
+def busy_worker(_):
+    """Spin for a short time."""
+    finish = time.time() + 0.05
+    while time.time() < finish:
+        pass
+
+
+def test_profiler_writes_profiles(tmpdir):
+    """Check that the profile and the sampled stacks of worker threads are written."""
+    path, stacks_path = str(tmpdir.join('profile')), str(tmpdir.join('stacks'))
+    profiler = profiling.Profiler(path, stacks_path)
+    profiler.start()
+    list(parallel.ordered_map(busy_worker, range(4), 2))
+    profiler.stop()
+    assert 0 < pstats.Stats(path).total_calls
+    stack_list = [ line.rsplit(' ', 1) for line in open(stacks_path).read().splitlines() ]
+    assert any('test_profiling.py:busy_worker' in stack for stack, _ in stack_list)
+    assert all(count.isdigit() for _, count in stack_list)
@@ -47,6 +47,34 @@ def test_projects_valid_url_argument(runner, context):
     assert 'CLOUD' in result.output
 
 
+def test_projects_with_mock_server(runner, mock_server):
+    result = runner.invoke(jtlib.scripts.jt, [ mock_server.url, 'projects', '--names', ], obj = dict())
+    assert 0 == result.exit_code
+    assert 'MOCK\tProject MOCK\nSMALL\tProject SMALL\n' == result.output
+
+
+def test_projects_cached(runner, mock_server, monkeypatch, tmpdir):
+    """Check that a cached project list is used while fresh and revalidated once expired."""
+    arguments = [ '--cache-dir', str(tmpdir), mock_server.url, 'projects', ]
+    assert 'MOCK\nSMALL\n' == runner.invoke(jtlib.scripts.jt, arguments, obj = dict()).output
+    monkeypatch.setitem(mock_server.projects, 'NEW', 1)
+    assert 'MOCK\nSMALL\n' == runner.invoke(jtlib.scripts.jt, arguments, obj = dict()).output
+    assert 'MOCK\nNEW\nSMALL\n' == runner.invoke(jtlib.scripts.jt, arguments + [ '--ttl', '0', ], obj = dict()).output
+    monkeypatch.delitem(mock_server.projects, 'NEW')
+    assert 'MOCK\nNEW\nSMALL\n' == runner.invoke(jtlib.scripts.jt, arguments, obj = dict()).output
+    assert 'MOCK\nSMALL\n' == runner.invoke(jtlib.scripts.jt, arguments + [ '--refresh', ], obj = dict()).output
+    assert 'MOCK\nSMALL\n' == runner.invoke(jtlib.scripts.jt, arguments + [ '--ttl', '0', ], obj = dict()).output # Unchanged.
+
+
+def test_projects_cached_without_requests(runner, mock_server, tmpdir):
+    """Check that a fresh cached project list is listed without contacting the server."""
+    arguments = [ '--cache-dir', str(tmpdir), mock_server.url, 'projects', ]
+    assert 'MOCK\nSMALL\n' == runner.invoke(jtlib.scripts.jt, arguments, obj = dict()).output
+    request_count = mock_server.request_count
+    assert 'MOCK\nSMALL\n' == runner.invoke(jtlib.scripts.jt, arguments, obj = dict()).output
+    assert request_count == mock_server.request_count
+
+
 command_list = [
     'project',
 ]
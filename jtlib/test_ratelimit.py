@@ -0,0 +1,69 @@
+# -*-coding:Utf-8 -*
+
+
+#--------------------------------------------------------------------------------
+# jtlib: test_ratelimit.py
+#
+# Unit tests for ratelimit.py.
+#--------------------------------------------------------------------------------
+# BSD 2-Clause License
+#
+# Copyright (c) 2018, Brian Minard
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#--------------------------------------------------------------------------------
+
+
+import jtlib.parallel as parallel
+import jtlib.ratelimit as ratelimit
+import time
+
+
+def test_token_bucket_limits_rate_across_threads():
+    """Check that threads share the rate."""
+    bucket = ratelimit.TokenBucket(200, burst = 1)
+    start = time.monotonic()
+    list(parallel.ordered_map(lambda _: bucket.acquire(), range(41), 4))
+    assert 0.19 <= time.monotonic() - start < 1.0
+
+
+def test_token_bucket_burst():
+    """Check that a full bucket permits a burst of requests without waiting."""
+    bucket = ratelimit.TokenBucket(1, burst = 10)
+    start = time.monotonic()
+    for _ in range(10):
+        bucket.acquire()
+    assert time.monotonic() - start < 0.1
+
+
+def test_token_bucket_throttled_waits_and_slows():
+    """Check that throttling waits for the server's delay, halves the rate and recovers."""
+    bucket = ratelimit.TokenBucket(100, burst = 5)
+    bucket.throttled(0.2)
+    assert 50.0 == bucket.rate
+    start = time.monotonic()
+    bucket.acquire()
+    assert 0.2 <= time.monotonic() - start
+    for _ in range(20):
+        bucket.succeeded()
+    assert 100.0 == bucket.rate
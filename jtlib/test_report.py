@@ -0,0 +1,111 @@
+# -*-coding:Utf-8 -*
+
+
+#--------------------------------------------------------------------------------
+# jtlib: test_report.py
+#
+# Test cases for the report module.
+#--------------------------------------------------------------------------------
+# BSD 2-Clause License
+#
+# Copyright (c) 2018, Brian Minard
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#--------------------------------------------------------------------------------
+
+
+import csv
+import io
+import jtlib
+import jtlib.report as report
+import pytest
+
+
+def worklog(author, started, seconds):
+    return { 'updateAuthor': { 'name': author, }, 'started': started, 'timeSpentSeconds': seconds, }
+
+
+@pytest.fixture(params = [ True, False, ])
+def use_numpy(request):
+    if request.param:
+        pytest.importorskip('numpy')
+    return request.param
+
+
+def test_worklog_totals(use_numpy):
+    """Check that work logs are counted and totalled by group, whether or not they are buffered."""
+    totals = report.WorklogTotals([ 'author', 'week', ], use_numpy)
+    totals.chunk_size = 3
+    for day in range(1, 11):
+        totals.add('FAKE-1', worklog('user{}'.format(day % 2), '2018-01-{:02}T09:00:00.000+0000'.format(day), 60 * day))
+    totals.add('FAKE-2', { 'started': '2018-01-01T09:00:00.000+0000', })
+    assert [
+        [ None, '2018-W01', 1, 0, ],
+        [ 'user0', '2018-W01', 3, 720, ],
+        [ 'user0', '2018-W02', 2, 1080, ],
+        [ 'user1', '2018-W01', 4, 960, ],
+        [ 'user1', '2018-W02', 1, 540, ],
+    ] == list(totals.rows())
+
+
+def test_worklog_week():
+    totals = report.WorklogTotals([ 'week', ])
+    assert '2017-W52' == totals.week('2017-12-31')
+    assert '2019-W01' == totals.week('2018-12-31')
+
+
+def report_rows(runner, arguments):
+    result = runner.invoke(jtlib.scripts.jt, arguments, obj = dict())
+    assert 0 == result.exit_code, result.output
+    return list(csv.reader(io.StringIO(result.output)))
+
+
+def test_report_worklog_by_author(runner, mock_server):
+    rows = report_rows(runner, [ mock_server.url, 'report', 'worklog', 'SMALL', '--by', 'author', ])
+    assert [
+        [ 'Author', 'Worklogs', 'Time Spent (s)', 'Time Spent (h)', ],
+        [ 'user1', '3', '10800', '3.0', ],
+        [ 'user2', '2', '14400', '4.0', ],
+        [ 'user3', '1', '10800', '3.0', ],
+    ] == rows
+
+
+def test_report_worklog_default_groups(runner, mock_server):
+    rows = report_rows(runner, [ mock_server.url, 'report', 'worklog', 'SMALL-2', 'SMALL-1', '--until', '2018-01-01', ])
+    assert [
+        [ 'Issue key', 'Author', 'Day', 'Worklogs', 'Time Spent (s)', 'Time Spent (h)', ],
+        [ 'SMALL-1', 'user1', '2018-01-01', '1', '3600', '1.0', ],
+        [ 'SMALL-2', 'user1', '2018-01-01', '1', '3600', '1.0', ],
+    ] == rows
+
+
+def test_report_worklog_many_issues(runner, mock_server):
+    """Check that work logs obtained separately from search results are included."""
+    rows = report_rows(runner, [ mock_server.url, 'report', 'worklog', 'MOCK', '--by', 'day', '--concurrency', '4',
+        '--since', '2018-01-03', ])
+    assert [ [ 'Day', 'Worklogs', 'Time Spent (s)', 'Time Spent (h)', ], [ '2018-01-03', '30', str(30 * 3 * 3600), '90.0', ], ] == rows
+
+
+def test_report_worklog_without_key(runner, mock_server):
+    result = runner.invoke(jtlib.scripts.jt, [ mock_server.url, 'report', 'worklog', ], obj = dict())
+    assert 2 == result.exit_code
@@ -0,0 +1,102 @@
+# -*-coding:Utf-8 -*
+
+
+#--------------------------------------------------------------------------------
+# jtlib: test_stats.py
+#
+# Unit tests for stats.py.
+#--------------------------------------------------------------------------------
+# BSD 2-Clause License
+#
+# Copyright (c) 2018, Brian Minard
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#--------------------------------------------------------------------------------
+
+
+import jtlib.stats as stats
+import pytest
+
+
+percentile_list = [
+    ([], 0.5, 0.0),
+    ([ 1.0, ], 0.99, 1.0),
+    ([ float(value) for value in range(1, 101) ], 0.5, 50.0),
+    ([ float(value) for value in range(1, 101) ], 0.95, 95.0),
+    ([ float(value) for value in range(1, 101) ], 0.99, 99.0),
+]
+
+
+@pytest.mark.parametrize("sorted_list, quantile, expected", percentile_list)
+def test_percentile(sorted_list, quantile, expected):
+    assert expected == stats.percentile(sorted_list, quantile)
+
+
+@pytest.fixture
+def recorded():
+    """Return statistics of a few requests."""
+    the_stats = stats.Stats()
+    for latency in [ 0.1, 0.2, 0.3, ]:
+        the_stats.record_request('search', latency, 1000, 200, 0)
+    the_stats.record_request('issue', 0.5, 500, 404, 2)
+    the_stats.add_issues(100)
+    the_stats.add_time('write', 1.5)
+    return the_stats
+
+
+def test_summary(recorded):
+    """Check that the summary reports requests, latency, issues and phases."""
+    line_list = recorded.summary().splitlines()
+    assert 'requests: 4 (issue 1, search 3), retries 2, errors 1' == line_list[0]
+    assert 'latency: p50 0.200 s, p95 0.500 s, p99 0.500 s' == line_list[1]
+    assert line_list[2].startswith('issues: 100 in ')
+    assert line_list[2].endswith(', 35 bytes/issue')
+    assert 'phases: write 1.500 s' == line_list[3]
+
+
+def test_prometheus(recorded, tmpdir):
+    """Check that statistics are written in the Prometheus text format."""
+    path = str(tmpdir.join('jt.prom'))
+    recorded.write_prometheus(path)
+    line_list = open(path).read().splitlines()
+    assert '# TYPE jt_requests_total counter' in line_list
+    assert 'jt_requests_total{kind="issue",status="404"} 1' in line_list
+    assert 'jt_request_duration_seconds{kind="search",quantile="0.5"} 0.2' in line_list
+    assert 'jt_request_duration_seconds_count{kind="search"} 3' in line_list
+    assert 'jt_request_retries_total{kind="issue"} 2' in line_list
+    assert 'jt_issues_total 100' in line_list
+    assert 'jt_phase_seconds_total{phase="write"} 1.5' in line_list
+
+
+def test_timed_without_stats():
+    """Check that nothing is timed without statistics."""
+    function, iterable = len, [ 1, 2, ]
+    assert function is stats.timed(None, 'extract', function)
+    assert iterable is stats.timed_iterable(None, 'fetch', iterable)
+
+
+def test_timed_iterable_counts_issues():
+    the_stats = stats.Stats()
+    assert [ 1, 2, 3, ] == list(stats.timed_iterable(the_stats, 'fetch', [ 1, 2, 3, ]))
+    assert 3 == the_stats.issue_count
+    assert 'fetch' in the_stats.summary()
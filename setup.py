@@ -73,6 +73,10 @@ setup(
         'jira',
         'pytest',
     ],
+    extras_require = {
+        'parquet': [ 'pyarrow', ], # Needed by the issue command's parquet format.
+        'report': [ 'numpy', ], # Speeds up the report command's totals.
+    },
     license = 'BSD',
     keywords = "JIRA",
 